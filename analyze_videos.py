@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Headless batch emotion analysis of recorded interviews.
+
+Each video is split into frame ranges that worker processes decode and
+analyze in parallel (face detection + one batched classification per
+frame). Every --stride-th frame is analyzed, and one compact timeline
+per video is written to --output-dir as <video name>.npz (one row per
+detected face: frame index, timestamp, box, label, float16 probabilities).
+
+With --detection-threads N each frame range is processed as a pipeline
+instead: a decode thread, N face detection threads and a classification
+stage batching the faces of consecutive frames, connected by bounded
+queues. Use it with few workers, e.g. for a single long recording.
+
+Usage: python analyze_videos.py VIDEO [VIDEO ...] [--workers 4] [--stride 1]
+"""
+
+import argparse
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from config import get_config, EMOTION_CONFIG
+from utils.datasets import get_labels
+from utils.video_analysis import (analyze_frame_range,
+                                  analyze_frame_range_pipelined,
+                                  count_video_frames, init_video_worker,
+                                  save_emotion_timeline, split_frame_ranges)
+
+
+def main():
+    config_class = get_config()
+    parser = argparse.ArgumentParser(
+        description='Headless batch emotion analysis of recorded interviews')
+    parser.add_argument('videos', nargs='+')
+    parser.add_argument('--output-dir', default='./emotion_timelines')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--stride', type=int, default=1,
+                        help='analyze every N-th frame')
+    parser.add_argument('--chunk-frames', type=int, default=300,
+                        help='frames per task handed to a worker')
+    parser.add_argument('--detection-threads', type=int, default=0,
+                        help='pipeline each frame range with N detection '
+                             'threads (0: sequential)')
+    parser.add_argument('--backend', default=config_class.EMOTION_BACKEND,
+                        choices=sorted(config_class.EMOTION_BACKEND_MODEL_PATHS))
+    args = parser.parse_args()
+    for name in ('workers', 'stride', 'chunk_frames'):
+        if getattr(args, name) < 1:
+            parser.error('--%s must be at least 1' % name.replace('_', '-'))
+    if args.detection_threads < 0:
+        parser.error('--detection-threads must be at least 0')
+
+    emotion_labels = get_labels(config_class.EMOTION_LABELS_DATASET)
+    detection_params = {
+        'scale_factor': EMOTION_CONFIG['face_detection_scale_factor'],
+        'min_neighbors': EMOTION_CONFIG['face_detection_min_neighbors'],
+        'min_size': EMOTION_CONFIG['face_detection_min_size'],
+        'confidence_threshold': EMOTION_CONFIG['dnn_face_confidence_threshold']
+    }
+    initargs = (str(config_class.EMOTION_BACKEND_MODEL_PATHS[args.backend]),
+                args.backend, config_class.FACE_DETECTOR,
+                str(config_class.FACE_DETECTOR_MODEL_PATHS[config_class.FACE_DETECTOR]),
+                str(config_class.DNN_FACE_PROTOTXT_PATH), detection_params,
+                config_class.EMOTION_OFFSETS, config_class.EMOTION_LABELS_DATASET)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    # TensorFlow is not fork-safe, so workers start from a fresh interpreter
+    pool = ProcessPoolExecutor(max_workers=args.workers,
+                               mp_context=multiprocessing.get_context('spawn'),
+                               initializer=init_video_worker, initargs=initargs)
+    with pool:
+        # load the models in every worker before the clock starts
+        list(pool.map(time.sleep, [0.1] * args.workers))
+
+        if args.detection_threads > 0:
+            analyze = analyze_frame_range_pipelined
+            pipeline_args = (args.detection_threads,)
+        else:
+            analyze, pipeline_args = analyze_frame_range, ()
+
+        start = time.time()
+        jobs = []
+        for video_path in args.videos:
+            try:
+                num_frames, fps = count_video_frames(video_path)
+            except Exception as e:
+                print(f"Warning: skipping {video_path}: {e}")
+                continue
+            frame_ranges = split_frame_ranges(num_frames, args.chunk_frames)
+            if not frame_ranges:
+                print(f"Warning: skipping {video_path}: it reports "
+                      f"{num_frames} frames")
+                continue
+            futures = [pool.submit(analyze, video_path, start_frame,
+                                   end_frame, args.stride, *pipeline_args)
+                       for start_frame, end_frame in frame_ranges]
+            jobs.append((video_path, fps, futures))
+
+        total_analyzed = 0
+        for video_path, fps, futures in jobs:
+            results = [future.result() for future in futures]
+            frame_indices, boxes, probabilities, analyzed = zip(*results)
+            output_path = os.path.join(
+                args.output_dir,
+                os.path.splitext(os.path.basename(video_path))[0] + '.npz')
+            save_emotion_timeline(output_path, np.concatenate(frame_indices),
+                                  np.concatenate(boxes),
+                                  np.concatenate(probabilities), fps,
+                                  args.stride, emotion_labels)
+            total_analyzed += sum(analyzed)
+            print(f"✓ {video_path}: {sum(analyzed)} frames analyzed, "
+                  f"{sum(len(rows) for rows in frame_indices)} faces -> "
+                  f"{output_path}")
+        elapsed = time.time() - start
+
+    num_cores = min(args.workers, os.cpu_count() or 1)
+    print(f"\n{total_analyzed} frames in {elapsed:.1f} s with {args.workers} "
+          f"workers on {num_cores} cores: {total_analyzed / elapsed:.1f} "
+          f"frames/s, {total_analyzed / elapsed / num_cores:.1f} frames/s/core")
+
+
+if __name__ == '__main__':
+    main()
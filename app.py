@@ -1,25 +1,31 @@
 from flask import Flask, render_template, request, jsonify, session, redirect, url_for
 from flask_socketio import SocketIO, emit
-import cv2
 import numpy as np
-import tensorflow as tf
-from tensorflow import keras
-import base64
-import io
-from PIL import Image
 import threading
+import queue
 import time
 import json
 import os
 from datetime import datetime
 import PyPDF2
-from collections import defaultdict
+from functools import partial
 import uuid
 
 # Import existing emotion detection utilities
+from utils.batching import BatchInferenceQueue
 from utils.datasets import get_labels
+from utils.emotion_classifier import load_emotion_classifier
+from utils.emotion_classifier import check_quantization_report
 from utils.inference import apply_offsets
-from utils.preprocessor import preprocess_input
+from utils.inference import decode_frame
+from utils.face_detection import load_face_detector
+from utils.face_tracking import AdaptiveFaceDetector
+from utils.face_tracking import FaceTracker
+from utils.workers import BoundedExecutor
+from utils.timers import TimerScheduler
+from utils.timeline import EmotionTimeline
+from utils.smoothing import EmotionSmoother
+from utils.preprocessor import preprocess_input_into
 
 # Import configuration
 from config import get_config, EMOTION_CONFIG, INTERVIEW_CONFIG, WEBSOCKET_EVENTS
@@ -39,19 +45,37 @@ if config_errors:
     print("Please fix these issues before running the application.")
 
 # Global variables for emotion detection
-emotion_model_path = str(config_class.EMOTION_MODEL_PATH)
+emotion_backend = config_class.EMOTION_BACKEND
+emotion_model_path = str(config_class.EMOTION_BACKEND_MODEL_PATHS.get(
+    emotion_backend, config_class.EMOTION_MODEL_PATH))
 emotion_labels = get_labels(config_class.EMOTION_LABELS_DATASET)
 emotion_offsets = config_class.EMOTION_OFFSETS
-face_cascade = cv2.CascadeClassifier(str(config_class.FACE_CASCADE_PATH))
 
-# Load emotion classifier if model exists
+# Load face detector and emotion classifier if models exist
+face_detection_model = None
 emotion_classifier = None
 emotion_target_size = None
 
 try:
-    emotion_classifier = keras.models.load_model(emotion_model_path)
-    emotion_target_size = emotion_classifier.input_shape[1:3]
-    print("✓ Emotion detection model loaded successfully")
+    face_detection_model = load_face_detector(
+        config_class.FACE_DETECTOR,
+        config_class.FACE_DETECTOR_MODEL_PATHS.get(config_class.FACE_DETECTOR,
+                                                   config_class.FACE_CASCADE_PATH),
+        prototxt_path=config_class.DNN_FACE_PROTOTXT_PATH,
+        scale_factor=EMOTION_CONFIG['face_detection_scale_factor'],
+        min_neighbors=EMOTION_CONFIG['face_detection_min_neighbors'],
+        min_size=EMOTION_CONFIG['face_detection_min_size'],
+        confidence_threshold=EMOTION_CONFIG['dnn_face_confidence_threshold']
+    )
+    if emotion_backend == 'tflite_int8':
+        check_quantization_report(config_class.EMOTION_INT8_REPORT_PATH,
+                                  config_class.EMOTION_INT8_MIN_AGREEMENT,
+                                  emotion_model_path)
+    emotion_classifier = load_emotion_classifier(
+        emotion_model_path, emotion_backend).warm_up(
+        (1, EMOTION_CONFIG['inference_max_batch_size']))
+    emotion_target_size = emotion_classifier.target_size
+    print(f"✓ Emotion detection model loaded successfully ({emotion_backend})")
 except Exception as e:
     print(f"⚠ Warning: Could not load emotion model: {e}")
     print("Emotion detection will be disabled.")
@@ -61,23 +85,97 @@ interview_sessions = {}
 organization_questions = {}
 
 class InterviewSession:
+    __slots__ = ('session_id', 'user_type', 'org_id', 'current_question',
+                 'answers', 'emotions_data', 'start_time',
+                 'question_start_time', 'is_recording', 'face_detector',
+                 'emotion_smoother',
+                 'frame_lock', 'pending_frame', 'frame_analysis_scheduled',
+                 'dropped_frames', 'clean_frames', 'base_capture_interval_ms',
+                 'capture_interval_ms')
+    
     def __init__(self, session_id, user_type, org_id=None):
         self.session_id = session_id
         self.user_type = user_type
         self.org_id = org_id
         self.current_question = 0
         self.answers = []
-        self.emotions_data = []
+        self.emotions_data = EmotionTimeline(
+            len(emotion_labels),
+            initial_capacity=EMOTION_CONFIG['emotion_timeline_initial_capacity'],
+            store_probabilities=True,
+            threshold=EMOTION_CONFIG['detection_confidence_threshold'])
         self.start_time = None
         self.question_start_time = None
         self.is_recording = False
+        self.face_detector = create_face_detector()
+        self.emotion_smoother = EmotionSmoother(
+            len(emotion_labels),
+            window_size=EMOTION_CONFIG['emotion_window_size'],
+            smoothing=EMOTION_CONFIG['emotion_smoothing'],
+            ema_alpha=EMOTION_CONFIG['emotion_ema_alpha'])
         
-    def add_emotion_data(self, emotion, timestamp):
-        self.emotions_data.append({
-            'emotion': emotion,
-            'timestamp': timestamp,
-            'question_index': self.current_question
-        })
+        # "latest frame wins" slot: at most one frame per session waits for
+        # the worker pool, a newer frame replaces it and the old one is dropped
+        self.frame_lock = threading.Lock()
+        self.pending_frame = None
+        self.frame_analysis_scheduled = False
+        self.dropped_frames = 0
+        self.clean_frames = 0
+        self.base_capture_interval_ms = config_class.get_capture_profile()['interval_ms']
+        self.capture_interval_ms = self.base_capture_interval_ms
+        
+    def put_frame(self, frame_data, timestamp):
+        """Store the newest frame; returns (needs_worker, dropped_previous)"""
+        with self.frame_lock:
+            dropped = self.pending_frame is not None
+            if dropped:
+                self.dropped_frames += 1
+            self.pending_frame = (frame_data, timestamp)
+            needs_worker = not self.frame_analysis_scheduled
+            self.frame_analysis_scheduled = True
+            return needs_worker, dropped
+    
+    def take_frame(self):
+        """Next frame to analyze, or None once the slot is empty"""
+        with self.frame_lock:
+            frame = self.pending_frame
+            self.pending_frame = None
+            if frame is None:
+                self.frame_analysis_scheduled = False
+            return frame
+    
+    def drop_pending_frame(self):
+        """Give up on the pending frame when no worker could be scheduled"""
+        with self.frame_lock:
+            if self.pending_frame is not None:
+                self.dropped_frames += 1
+            self.pending_frame = None
+            self.frame_analysis_scheduled = False
+    
+    def update_capture_interval(self, dropped):
+        """Back off the client's capture interval while frames are being
+        dropped and recover towards the profile interval once they are not.
+        Returns the new interval, or None if it did not change."""
+        interval = self.capture_interval_ms
+        if dropped:
+            self.clean_frames = 0
+            interval = min(interval * 2, self.base_capture_interval_ms *
+                           EMOTION_CONFIG['capture_throttle_max_factor'])
+        else:
+            self.clean_frames += 1
+            if self.clean_frames >= EMOTION_CONFIG['capture_throttle_recovery_frames']:
+                self.clean_frames = 0
+                interval = max(interval // 2, self.base_capture_interval_ms)
+        
+        if interval == self.capture_interval_ms:
+            return None
+        self.capture_interval_ms = interval
+        return interval
+        
+    def add_emotion_data(self, emotion_label_arg, timestamp,
+                         emotion_prediction=None):
+        self.emotions_data.append(emotion_label_arg, timestamp,
+                                  self.current_question, emotion_prediction)
     
     def add_answer(self, answer_text):
         self.answers.append({
@@ -107,47 +205,50 @@ def extract_questions_from_pdf(pdf_file):
         print(f"Error extracting questions: {e}")
         return []
 
-def detect_emotion_from_frame(frame_data):
-    """Detect emotion from base64 encoded frame"""
+def create_face_detector():
+    """Per-session face detector: learned search parameters and tracking"""
+    face_detector = face_detection_model
+    if EMOTION_CONFIG['face_adaptive_detection_enabled']:
+        face_detector = AdaptiveFaceDetector(
+            face_detector,
+            warmup_detections=EMOTION_CONFIG['face_adaptive_warmup_detections'],
+            size_margin=EMOTION_CONFIG['face_adaptive_size_margin'],
+            region_margin=EMOTION_CONFIG['face_adaptive_region_margin']
+        )
+    if EMOTION_CONFIG['face_tracking_enabled']:
+        face_detector = FaceTracker(
+            face_detector,
+            redetect_interval=EMOTION_CONFIG['face_tracking_redetect_interval'],
+            search_margin=EMOTION_CONFIG['face_tracking_search_margin'],
+            size_tolerance=EMOTION_CONFIG['face_tracking_size_tolerance']
+        )
+    return face_detector
+
+def extract_face_from_frame(frame_data, face_detector=None):
+    """Decode a JPEG frame (binary or base64) and return the preprocessed face crop"""
     if not emotion_classifier:
         return None
         
     try:
-        # Decode base64 image
-        image_data = base64.b64decode(frame_data.split(',')[1])
-        image = Image.open(io.BytesIO(image_data))
-        frame = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+        gray_image = decode_frame(frame_data)
+        if gray_image is None:
+            return None
         
-        gray_image = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        faces = face_cascade.detectMultiScale(
-            gray_image, 
-            scaleFactor=EMOTION_CONFIG['face_detection_scale_factor'], 
-            minNeighbors=EMOTION_CONFIG['face_detection_min_neighbors'],
-            minSize=EMOTION_CONFIG['face_detection_min_size'], 
-            flags=cv2.CASCADE_SCALE_IMAGE
-        )
+        faces = (face_detector or face_detection_model)(gray_image)
         
         if len(faces) > 0:
             face_coordinates = faces[0]  # Use first detected face
-            x1, x2, y1, y2 = apply_offsets(face_coordinates, emotion_offsets)
-            gray_face = gray_image[y1:y2, x1:x2]
+            # Offsets are tuned for VIDEO_WIDTH; scale them to the frame sent
+            scale = gray_image.shape[1] / float(config_class.VIDEO_WIDTH)
+            offsets = (int(emotion_offsets[0] * scale),
+                       int(emotion_offsets[1] * scale))
+            x1, x2, y1, y2 = apply_offsets(face_coordinates, offsets)
+            gray_face = gray_image[max(y1, 0):y2, max(x1, 0):x2]
             
             try:
-                gray_face = cv2.resize(gray_face, emotion_target_size)
-                gray_face = preprocess_input(gray_face, True)
-                gray_face = np.expand_dims(gray_face, 0)
-                gray_face = np.expand_dims(gray_face, -1)
-                
-                emotion_prediction = emotion_classifier.predict(gray_face)
-                emotion_probability = np.max(emotion_prediction)
-                
-                # Only return emotion if confidence is above threshold
-                if emotion_probability >= EMOTION_CONFIG['detection_confidence_threshold']:
-                    emotion_label_arg = np.argmax(emotion_prediction)
-                    emotion_text = emotion_labels[emotion_label_arg]
-                    return emotion_text
-                
+                # the crop waits in the batching queue, so it gets its own buffer
+                face_buffer = np.empty(emotion_classifier.input_shape, dtype=np.float32)
+                return preprocess_input_into(gray_face, face_buffer, True)
             except Exception as e:
                 print(f"Error processing face: {e}")
                 return None
@@ -157,10 +258,103 @@ def detect_emotion_from_frame(frame_data):
         print(f"Error in emotion detection: {e}")
         return None
 
+def classify_emotion(emotion_prediction):
+    """Return the emotion label for a prediction, or None below threshold"""
+    emotion_probability = np.max(emotion_prediction)
+    
+    # Only return emotion if confidence is above threshold
+    if emotion_probability >= EMOTION_CONFIG['detection_confidence_threshold']:
+        emotion_label_arg = np.argmax(emotion_prediction)
+        return emotion_labels[emotion_label_arg]
+    return None
+
+def handle_emotion_prediction(session_id, timestamp, emotion_prediction):
+    """Deliver a batched prediction back to the session that sent the frame"""
+    session_obj = interview_sessions.get(session_id)
+    if session_obj is None:
+        return
+    
+    # keep every prediction so results can be recomputed at any threshold
+    session_obj.add_emotion_data(np.argmax(emotion_prediction), timestamp,
+                                 emotion_prediction)
+    
+    # the live display shows the smoothed emotion of the recent frames
+    emotion_label_arg = session_obj.emotion_smoother.update(emotion_prediction)
+    if classify_emotion(emotion_prediction):
+        emotion = emotion_labels[emotion_label_arg]
+        pending_emits.put((WEBSOCKET_EVENTS['EMOTION_DETECTED'], {
+            'emotion': emotion,
+            'timestamp': timestamp
+        }, session_id))
+
+def relay_pending_emits():
+    """Send events queued by worker threads from the Socket.IO event loop.
+
+    Native threads cannot wake the eventlet hub, so socketio.emit() called
+    from them sits unsent until unrelated traffic arrives.
+    """
+    interval = EMOTION_CONFIG['emit_relay_interval_ms'] / 1000.0
+    while True:
+        try:
+            event, data, room = pending_emits.get_nowait()
+        except queue.Empty:
+            socketio.sleep(interval)
+            continue
+        socketio.emit(event, data, room=room)
+
+def analyze_session_frames(session_id, session_obj):
+    """Worker-thread half of emotion_frame: decode, detect, queue for inference.
+
+    Only one worker drains a session's frame slot at a time, which also
+    keeps its stateful face tracker single-threaded.
+    """
+    while True:
+        frame = session_obj.take_frame()
+        if frame is None:
+            return
+        frame_data, timestamp = frame
+        gray_face = extract_face_from_frame(frame_data, session_obj.face_detector)
+        
+        if gray_face is not None:
+            emotion_inference_queue.submit(gray_face, partial(
+                handle_emotion_prediction, session_id, timestamp))
+
+# Shared queue batching face crops from all sessions into one forward pass,
+# fed by a bounded native-thread pool that keeps the CPU-bound frame work
+# off the Socket.IO event loop
+emotion_inference_queue = None
+frame_analysis_pool = None
+pending_emits = queue.Queue()
+if emotion_classifier:
+    emotion_inference_queue = BatchInferenceQueue(
+        emotion_classifier.predict,
+        max_batch_size=EMOTION_CONFIG['inference_max_batch_size'],
+        max_wait=EMOTION_CONFIG['inference_max_wait_ms'] / 1000.0
+    )
+    # more threads than cores only compete with the event loop for the GIL
+    frame_analysis_pool = BoundedExecutor(
+        max_workers=min(EMOTION_CONFIG['frame_analysis_workers'],
+                        os.cpu_count() or 1),
+        max_pending=EMOTION_CONFIG['frame_analysis_max_pending'],
+        thread_name_prefix='frame-analysis'
+    )
+    socketio.start_background_task(relay_pending_emits)
+
+# One scheduler on the Socket.IO event loop owns every question deadline
+question_timers = TimerScheduler(sleep=socketio.sleep)
+socketio.start_background_task(question_timers.run)
+
 @app.route('/')
 def index():
     return render_template('index.html')
 
+@app.route('/status')
+def status():
+    return jsonify({
+        'active_sessions': len(interview_sessions),
+        'pending_question_timers': question_timers.pending()
+    })
+
 @app.route('/organization')
 def organization():
     return render_template('organization.html')
@@ -224,7 +418,8 @@ def handle_join_interview(data):
         print(f"Found {len(questions)} questions for org_id {org_id}")
         emit(WEBSOCKET_EVENTS['INTERVIEW_STARTED'], {
             'total_questions': len(questions),
-            'first_question': questions[0] if questions else None
+            'first_question': questions[0] if questions else None,
+            'capture_profile': config_class.get_capture_profile()
         })
     elif user_type == 'candidate':
         print(f"No questions found for org_id {org_id}")
@@ -232,8 +427,15 @@ def handle_join_interview(data):
             'message': f'No interview session found for ID: {org_id}. Please check with the organization.'
         })
 
+def handle_question_timeout(session_id):
+    """Question deadline reached before the candidate submitted an answer"""
+    session_obj = interview_sessions.get(session_id)
+    if session_obj and session_obj.is_recording:
+        socketio.emit(WEBSOCKET_EVENTS['QUESTION_TIMEOUT'], room=session_id)
+        session_obj.is_recording = False
+
 @socketio.on(WEBSOCKET_EVENTS['START_QUESTION'])
-def handle_start_question(data):
+def handle_start_question(data=None):
     session_id = request.sid
     if session_id in interview_sessions:
         session_obj = interview_sessions[session_id]
@@ -241,15 +443,8 @@ def handle_start_question(data):
         session_obj.is_recording = True
         
         # Start question timer using config
-        def question_timer():
-            time.sleep(config_class.QUESTION_TIME_LIMIT)
-            if session_id in interview_sessions and interview_sessions[session_id].is_recording:
-                socketio.emit(WEBSOCKET_EVENTS['QUESTION_TIMEOUT'], room=session_id)
-                interview_sessions[session_id].is_recording = False
-        
-        timer_thread = threading.Thread(target=question_timer)
-        timer_thread.daemon = True
-        timer_thread.start()
+        question_timers.schedule(session_id, config_class.QUESTION_TIME_LIMIT,
+                                 partial(handle_question_timeout, session_id))
 
 @socketio.on(WEBSOCKET_EVENTS['EMOTION_FRAME'])
 def handle_emotion_frame(data):
@@ -257,17 +452,19 @@ def handle_emotion_frame(data):
     if session_id in interview_sessions:
         session_obj = interview_sessions[session_id]
         
-        if session_obj.is_recording:
-            frame_data = data['frame']
-            emotion = detect_emotion_from_frame(frame_data)
+        if session_obj.is_recording and frame_analysis_pool:
+            needs_worker, dropped = session_obj.put_frame(data['frame'],
+                                                          time.time())
+            if needs_worker and not frame_analysis_pool.submit(
+                    analyze_session_frames, session_id, session_obj):
+                session_obj.drop_pending_frame()
+                dropped = True
             
-            if emotion:
-                timestamp = time.time()
-                session_obj.add_emotion_data(emotion, timestamp)
-                
-                emit(WEBSOCKET_EVENTS['EMOTION_DETECTED'], {
-                    'emotion': emotion,
-                    'timestamp': timestamp
+            interval = session_obj.update_capture_interval(dropped)
+            if interval:
+                emit(WEBSOCKET_EVENTS['CAPTURE_THROTTLE'], {
+                    'interval_ms': interval,
+                    'dropped_frames': session_obj.dropped_frames
                 })
 
 @socketio.on(WEBSOCKET_EVENTS['SUBMIT_ANSWER'])
@@ -279,6 +476,7 @@ def handle_submit_answer(data):
         
         session_obj.add_answer(answer_text)
         session_obj.is_recording = False
+        question_timers.cancel(session_id)
         session_obj.current_question += 1
         
         # Check if there are more questions
@@ -297,22 +495,53 @@ def handle_submit_answer(data):
                 # Interview completed
                 emit(WEBSOCKET_EVENTS['INTERVIEW_COMPLETED'])
 
+def emotion_count_dict(emotion_counts):
+    return {emotion_labels[emotion_label_arg]: int(count)
+            for emotion_label_arg, count in enumerate(emotion_counts)
+            if count > 0}
+
+def parse_threshold(data, default):
+    """Client-supplied confidence threshold, or `default` when missing or
+    not a finite number"""
+    if not isinstance(data, dict) or data.get('threshold') is None:
+        return default
+    try:
+        threshold = float(data['threshold'])
+    except (TypeError, ValueError):
+        print(f"Ignoring invalid threshold: {data['threshold']!r}")
+        return default
+    if not np.isfinite(threshold):
+        print(f"Ignoring invalid threshold: {data['threshold']!r}")
+        return default
+    return threshold
+
 @socketio.on(WEBSOCKET_EVENTS['GET_RESULTS'])
-def handle_get_results(data):
+def handle_get_results(data=None):
     session_id = request.sid
     if session_id in interview_sessions:
         session_obj = interview_sessions[session_id]
+        emotions_data = session_obj.emotions_data
+        threshold = parse_threshold(data, emotions_data.threshold)
         
-        # Calculate emotion statistics
-        emotion_counts = defaultdict(int)
-        for emotion_data in session_obj.emotions_data:
-            emotion_counts[emotion_data['emotion']] += 1
+        # Running aggregates are O(1); another threshold needs a recompute
+        if threshold == emotions_data.threshold:
+            stats = emotions_data.summary()
+        else:
+            stats = emotions_data.summarize(threshold)
         
         # Prepare results
         results = {
             'answers': session_obj.answers,
-            'emotion_stats': dict(emotion_counts),
-            'total_emotions_detected': len(session_obj.emotions_data),
+            'emotion_stats': emotion_count_dict(stats['counts']),
+            'question_emotion_stats': [emotion_count_dict(question_counts)
+                                       for question_counts in stats['question_counts']],
+            'total_emotions_detected': int(stats['counts'].sum()),
+            'frames_analyzed': len(emotions_data),
+            'mean_probabilities': {emotion_labels[emotion_label_arg]: float(probability)
+                                   for emotion_label_arg, probability in enumerate(stats['mean_probabilities'])},
+            'mean_entropy': stats['mean_entropy'],
+            'emotion_duration': stats['duration'],
+            'confidence_threshold': threshold,
             'interview_duration': time.time() - (session_obj.question_start_time or time.time())
         }
         
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+ImageGenerator augmentation throughput: transform() one image at a time
+plus np.asarray of a list (the flow loop) vs. transform_batch() on a
+preallocated (batch, height, width, 3) array.
+
+Usage: python -m benchmarks.augmentation [--batch-size 32] [--size 64] [--batches 50]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from utils.data_augmentation import ImageGenerator
+
+
+def per_image(image_generator, images):
+    inputs = []
+    for image_array in images:
+        image_array = image_array.astype('float32')
+        inputs.append(image_generator.transform(image_array)[0])
+    return np.asarray(inputs)
+
+
+def batched(image_generator, images, inputs):
+    inputs[...] = images
+    return image_generator.transform_batch(inputs)
+
+
+def images_per_second(function, num_batches, batch_size, *args):
+    function(*args)
+    start = time.perf_counter()
+    for _ in range(num_batches):
+        function(*args)
+    return num_batches * batch_size / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--size', type=int, default=64)
+    parser.add_argument('--batches', type=int, default=50)
+    args = parser.parse_args()
+
+    random_state = np.random.RandomState(0)
+    images = random_state.randint(
+        0, 256, (args.batch_size, args.size, args.size, 3)).astype('uint8')
+    image_generator = ImageGenerator({}, args.batch_size,
+                                     (args.size, args.size), [], [])
+    image_generator.fit_lighting(images)
+    inputs = np.empty(images.shape, dtype='float32')
+
+    print(f"batches of {args.batch_size} {args.size}x{args.size} RGB images, "
+          f"all jitters, lighting and flips\n")
+    current = images_per_second(per_image, args.batches, args.batch_size,
+                                image_generator, images)
+    print(f"{'per-image transform':<24}{current:>10.0f} images/s")
+    vectorized = images_per_second(batched, args.batches, args.batch_size,
+                                   image_generator, images, inputs)
+    print(f"{'transform_batch':<24}{vectorized:>10.0f} images/s   "
+          f"({vectorized / current:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
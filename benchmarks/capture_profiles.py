@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Bytes per frame and server CPU per frame for each capture profile.
+
+Frames from demo/dinner.mp4 are downscaled and JPEG-encoded the way the
+candidate page does for each entry of Config.CAPTURE_PROFILES, then run
+through the server-side decode + face detection path.
+
+Usage: python -m benchmarks.capture_profiles [--frames 100]
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from config import get_config, EMOTION_CONFIG
+from utils.inference import decode_frame
+
+VIDEO_PATH = './demo/dinner.mp4'
+
+
+def load_frames(num_frames, width, height):
+    frames = []
+    capture = cv2.VideoCapture(VIDEO_PATH)
+    while capture.isOpened() and len(frames) < num_frames:
+        ret, bgr_image = capture.read()
+        if not ret:
+            break
+        frames.append(cv2.resize(bgr_image, (width, height)))
+    capture.release()
+    return frames
+
+
+def encode_for_profile(bgr_image, profile):
+    """Mimic captureAndAnalyzeEmotion(): fit, optionally gray, JPEG."""
+    height, width = bgr_image.shape[:2]
+    scale = min(1.0, profile['width'] / float(width),
+                profile['height'] / float(height))
+    size = (int(round(width * scale)), int(round(height * scale)))
+    image = cv2.resize(bgr_image, size, interpolation=cv2.INTER_AREA)
+    if profile['grayscale']:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    quality = int(profile['jpeg_quality'] * 100)
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1]
+
+
+def main():
+    config_class = get_config()
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--frames', type=int, default=100)
+    args = parser.parse_args()
+
+    face_cascade = cv2.CascadeClassifier(str(config_class.FACE_CASCADE_PATH))
+    frames = load_frames(args.frames, config_class.VIDEO_WIDTH,
+                         config_class.VIDEO_HEIGHT)
+
+    print(f"{'profile':<10}{'size':>10}{'bytes/frame':>14}"
+          f"{'decode ms':>12}{'detect ms':>12}{'faces':>8}")
+    for name, profile in config_class.CAPTURE_PROFILES.items():
+        payloads = [encode_for_profile(frame, profile).tobytes()
+                    for frame in frames]
+        decode_time = detect_time = 0.0
+        num_faces = 0
+        for payload in payloads:
+            start = time.process_time()
+            gray_image = decode_frame(payload)
+            decoded = time.process_time()
+            faces = face_cascade.detectMultiScale(
+                gray_image,
+                scaleFactor=EMOTION_CONFIG['face_detection_scale_factor'],
+                minNeighbors=EMOTION_CONFIG['face_detection_min_neighbors'],
+                minSize=EMOTION_CONFIG['face_detection_min_size'],
+                flags=cv2.CASCADE_SCALE_IMAGE)
+            detect_time += time.process_time() - decoded
+            decode_time += decoded - start
+            num_faces += len(faces)
+
+        size = f"{gray_image.shape[1]}x{gray_image.shape[0]}"
+        print(f"{name:<10}{size:>10}{np.mean([len(p) for p in payloads]):>14.0f}"
+              f"{decode_time / len(payloads) * 1000:>12.3f}"
+              f"{detect_time / len(payloads) * 1000:>12.3f}{num_faces:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Startup time and peak RSS of one evaluation pass over FER2013: the whole
+float32 dataset from DataManager.get_data() vs. per-batch float32 from the
+memory-mapped uint8 MappedDataset, on a synthetic fer2013.csv.
+
+Usage: python -m benchmarks.dataset_memory [--rows 35887] [--size 64] [--batch-size 256]
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+from utils.datasets import DataManager
+from utils.preprocessor import preprocess_input
+from benchmarks.fer2013_loading import write_synthetic_csv
+
+
+def _evaluation_pass(csv_path, image_size, batch_size, mapped):
+    """Stands in for an evaluation loop: every face is preprocessed once"""
+    start = time.perf_counter()
+    data_loader = DataManager('fer2013', csv_path, image_size)
+    if mapped:
+        dataset = data_loader.get_mapped_data()
+        batches = dataset.iter_batches(batch_size)
+    else:
+        faces, emotions = data_loader.get_data()
+        batches = ((faces[batch_start:batch_start + batch_size],
+                    emotions[batch_start:batch_start + batch_size])
+                   for batch_start in range(0, len(faces), batch_size))
+    startup = time.perf_counter() - start
+    pixel_sum = 0.0
+    for faces, emotions in batches:
+        pixel_sum += preprocess_input(faces, True).sum()
+    elapsed = time.perf_counter() - start
+    # ru_maxrss is reported in kilobytes on Linux
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+    return startup, elapsed, peak_rss
+
+
+def measure(csv_path, image_size, batch_size, mapped):
+    """Run in a fresh process so that peak RSS covers this pass only"""
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return pool.apply(_evaluation_pass,
+                          (csv_path, image_size, batch_size, mapped))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--rows', type=int, default=35887)
+    parser.add_argument('--size', type=int, default=64)
+    parser.add_argument('--batch-size', type=int, default=256)
+    args = parser.parse_args()
+    image_size = (args.size, args.size)
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'fer2013.csv')
+        write_synthetic_csv(csv_path, args.rows)
+        print(f"{args.rows} faces at {args.size}x{args.size}, batches of "
+              f"{args.batch_size}\n")
+        print(f"{'':<20}{'startup s':>11}{'pass s':>9}{'peak RSS MB':>14}")
+        # the first run parses the CSV and writes the .npy cache that the
+        # other two read, so they differ only in the in-memory layout
+        for name, mapped in [('first run (parse)', True),
+                             ('float32 get_data', False),
+                             ('uint8 memory map', True)]:
+            startup, elapsed, peak_rss = measure(csv_path, image_size,
+                                                 args.batch_size, mapped)
+            print(f"{name:<20}{startup:>11.2f}{elapsed:>9.2f}{peak_rss:>14.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Throughput and hit rate of each face detector backend on demo/dinner.mp4.
+
+Detectors whose model files are missing are skipped (python install.py
+downloads the LBP cascade and the res10 DNN model).
+
+Usage: python -m benchmarks.face_detectors [--frames 200] [--width 640]
+"""
+
+import argparse
+import time
+
+from config import get_config, EMOTION_CONFIG
+from utils.face_detection import FACE_DETECTORS, load_face_detector
+from benchmarks.face_tracking import load_gray_frames
+
+
+def main():
+    config_class = get_config()
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--frames', type=int, default=200)
+    parser.add_argument('--width', type=int, default=640)
+    args = parser.parse_args()
+
+    frames = load_gray_frames(args.frames, args.width)
+    print(f"{len(frames)} frames at {frames[0].shape[1]}x{frames[0].shape[0]}\n")
+    print(f"{'detector':<10}{'ms/frame':>10}{'frames/s':>10}"
+          f"{'hit rate':>10}{'faces/frame':>13}")
+
+    for detector_name in FACE_DETECTORS:
+        model_path = config_class.FACE_DETECTOR_MODEL_PATHS[detector_name]
+        if not model_path.exists():
+            print(f"{detector_name:<10}  skipped, {model_path} not found")
+            continue
+        detect = load_face_detector(
+            detector_name, model_path,
+            prototxt_path=config_class.DNN_FACE_PROTOTXT_PATH,
+            scale_factor=EMOTION_CONFIG['face_detection_scale_factor'],
+            min_neighbors=EMOTION_CONFIG['face_detection_min_neighbors'],
+            min_size=EMOTION_CONFIG['face_detection_min_size'],
+            confidence_threshold=EMOTION_CONFIG['dnn_face_confidence_threshold'])
+
+        detect(frames[0])
+        hits = num_faces = 0
+        start = time.perf_counter()
+        for gray_image in frames:
+            faces = detect(gray_image)
+            hits += len(faces) > 0
+            num_faces += len(faces)
+        elapsed = time.perf_counter() - start
+
+        print(f"{detector_name:<10}{elapsed / len(frames) * 1000:>10.2f}"
+              f"{len(frames) / elapsed:>10.1f}{hits / float(len(frames)):>10.1%}"
+              f"{num_faces / float(len(frames)):>13.2f}")
+
+
+if __name__ == '__main__':
+    main()
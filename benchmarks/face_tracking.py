@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Full-frame detection (configured FACE_DETECTOR) on every frame vs the per-session
+AdaptiveFaceDetector (learned ROI and face size range), FaceTracker, and
+both combined as app.py builds them.
+
+Usage: python -m benchmarks.face_tracking [--frames 300] [--width 640]
+"""
+
+import argparse
+import time
+
+import cv2
+
+from config import get_config, EMOTION_CONFIG
+from utils.face_detection import load_face_detector
+from utils.face_tracking import AdaptiveFaceDetector, FaceTracker
+
+VIDEO_PATH = './demo/dinner.mp4'
+
+
+def load_gray_frames(num_frames, width):
+    frames = []
+    capture = cv2.VideoCapture(VIDEO_PATH)
+    while capture.isOpened() and len(frames) < num_frames:
+        ret, bgr_image = capture.read()
+        if not ret:
+            break
+        height = int(bgr_image.shape[0] * width / float(bgr_image.shape[1]))
+        bgr_image = cv2.resize(bgr_image, (width, height))
+        frames.append(cv2.cvtColor(bgr_image, cv2.COLOR_BGR2GRAY))
+    capture.release()
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--width', type=int, default=640)
+    args = parser.parse_args()
+
+    config_class = get_config()
+    detect_faces = load_face_detector(
+        config_class.FACE_DETECTOR,
+        config_class.FACE_DETECTOR_MODEL_PATHS[config_class.FACE_DETECTOR],
+        prototxt_path=config_class.DNN_FACE_PROTOTXT_PATH,
+        scale_factor=EMOTION_CONFIG['face_detection_scale_factor'],
+        min_neighbors=EMOTION_CONFIG['face_detection_min_neighbors'],
+        min_size=EMOTION_CONFIG['face_detection_min_size'],
+        confidence_threshold=EMOTION_CONFIG['dnn_face_confidence_threshold'])
+
+    def create_adaptive():
+        return AdaptiveFaceDetector(
+            detect_faces,
+            warmup_detections=EMOTION_CONFIG['face_adaptive_warmup_detections'],
+            size_margin=EMOTION_CONFIG['face_adaptive_size_margin'],
+            region_margin=EMOTION_CONFIG['face_adaptive_region_margin'])
+
+    def create_tracker(face_detector):
+        return FaceTracker(
+            face_detector,
+            redetect_interval=EMOTION_CONFIG['face_tracking_redetect_interval'],
+            search_margin=EMOTION_CONFIG['face_tracking_search_margin'],
+            size_tolerance=EMOTION_CONFIG['face_tracking_size_tolerance'])
+
+    frames = load_gray_frames(args.frames, args.width)
+    adaptive = create_adaptive()
+    tracker = create_tracker(detect_faces)
+    modes = (('full-frame', detect_faces),
+             ('adaptive', adaptive),
+             ('tracking', tracker),
+             ('both', create_tracker(create_adaptive())))
+
+    results = {}
+    for name, detect in modes:
+        hits = 0
+        start = time.perf_counter()
+        for gray_image in frames:
+            hits += len(detect(gray_image)) > 0
+        elapsed = time.perf_counter() - start
+        results[name] = elapsed / len(frames) * 1000.0
+        print(f"{name:<12}{results[name]:9.2f} ms/frame "
+              f"({results['full-frame'] / results[name]:4.1f}x)   "
+              f"frames with a face: {hits}/{len(frames)}")
+
+    print(f"\nAdaptive: {adaptive.restricted_detections} restricted, "
+          f"{adaptive.unrestricted_detections} unrestricted detections")
+    print(f"Tracker:  {tracker.full_detections} full-frame detections, "
+          f"{tracker.tracked_detections} tracked frames")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+FER2013 loading: the per-row list comprehension loader vs. the vectorized
+parser and the memory-mapped .npy cache, on a synthetic fer2013.csv.
+
+Usage: python -m benchmarks.fer2013_loading [--rows 35887] [--size 64]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from utils.datasets import DataManager
+
+
+def write_synthetic_csv(csv_path, num_rows, chunk_rows=1024):
+    random_state = np.random.RandomState(0)
+    with open(csv_path, 'w') as csv_file:
+        csv_file.write('emotion,pixels,Usage\n')
+        for chunk_start in range(0, num_rows, chunk_rows):
+            chunk_size = min(chunk_rows, num_rows - chunk_start)
+            pixels = random_state.randint(0, 256, (chunk_size, 48 * 48))
+            emotions = random_state.randint(0, 7, chunk_size)
+            for emotion, face in zip(emotions, pixels):
+                csv_file.write('%d,%s,Training\n' %
+                               (emotion, ' '.join(map(str, face))))
+
+
+def load_per_row(csv_path, image_size):
+    """The original DataManager._load_fer2013"""
+    data = pd.read_csv(csv_path)
+    pixels = data['pixels'].tolist()
+    width, height = 48, 48
+    faces = []
+    for pixel_sequence in pixels:
+        face = [int(pixel) for pixel in pixel_sequence.split(' ')]
+        face = np.asarray(face).reshape(width, height)
+        face = cv2.resize(face.astype('uint8'), image_size)
+        faces.append(face.astype('float32'))
+    faces = np.asarray(faces)
+    faces = np.expand_dims(faces, -1)
+    emotions = pd.get_dummies(data['emotion']).values
+    return faces, emotions
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--rows', type=int, default=35887)
+    parser.add_argument('--size', type=int, default=64,
+                        help='image_size side (48 skips the resize)')
+    args = parser.parse_args()
+    image_size = (args.size, args.size)
+
+    with tempfile.TemporaryDirectory() as directory:
+        csv_path = os.path.join(directory, 'fer2013.csv')
+        write_synthetic_csv(csv_path, args.rows)
+        print(f"{args.rows} rows, {os.path.getsize(csv_path) / 2**20:.0f} MB "
+              f"csv, image_size {image_size}\n")
+
+        (reference, _), per_row = timed(load_per_row, csv_path, image_size)
+        print(f"{'per-row parse':<24}{per_row:>8.2f} s")
+        del reference
+
+        data_loader = DataManager('fer2013', csv_path, image_size)
+        (faces, emotions), parsed = timed(data_loader.get_data)
+        print(f"{'vectorized parse':<24}{parsed:>8.2f} s   "
+              f"({per_row / parsed:.1f}x, writes the cache)")
+        (cached_faces, cached_emotions), cached = timed(data_loader.get_data)
+        assert np.array_equal(faces, cached_faces), 'cache differs'
+        assert np.array_equal(emotions, cached_emotions), 'cache differs'
+        print(f"{'cached load':<24}{cached:>8.2f} s   ({per_row / cached:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Per-frame emotion inference latency: Keras predict() vs the graph-mode
+EmotionClassifier wrapper.
+
+Usage: python -m benchmarks.inference_latency [--iterations 200]
+"""
+
+import argparse
+import time
+
+import numpy as np
+from tensorflow import keras
+
+from config import get_config
+from utils.emotion_classifier import EmotionClassifier
+
+
+def time_per_call(predict_fn, faces, iterations):
+    predict_fn(faces)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        predict_fn(faces)
+    return (time.perf_counter() - start) / iterations * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--model', default=str(get_config().EMOTION_MODEL_PATH))
+    parser.add_argument('--iterations', type=int, default=200)
+    args = parser.parse_args()
+
+    model = keras.models.load_model(args.model, compile=False)
+    classifier = EmotionClassifier(args.model).warm_up()
+    face = np.random.uniform(-1, 1, (1,) + classifier.input_shape)
+    face = face.astype('float32')
+
+    predict_ms = time_per_call(lambda x: model.predict(x, verbose=0),
+                               face, args.iterations)
+    graph_ms = time_per_call(classifier.predict, face, args.iterations)
+    max_error = np.abs(model.predict(face, verbose=0) -
+                       classifier.predict(face)).max()
+
+    print(f"Model: {args.model}")
+    print(f"keras predict():      {predict_ms:8.3f} ms/frame")
+    print(f"EmotionClassifier:    {graph_ms:8.3f} ms/frame")
+    print(f"Speedup:              {predict_ms / graph_ms:8.1f}x")
+    print(f"Max abs difference:   {max_error:.2e}")
+
+
+if __name__ == '__main__':
+    main()
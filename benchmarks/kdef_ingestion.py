@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+KDEF ingestion: the serial os.walk + cv2.imread loop vs. the process-pool
+reader of DataManager('KDEF'), on a synthetic directory of generated JPEGs.
+
+Usage: python -m benchmarks.kdef_ingestion [--images 3000] [--workers 1 2 4]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from utils.datasets import DataManager, get_class_to_arg
+
+
+def write_synthetic_kdef(directory, num_images, image_shape=(762, 562)):
+    """KDEF-like tree: one folder per session, <session><emotion><view>.JPG.
+    Every 500th file gets an emotion code that matches no class."""
+    random_state = np.random.RandomState(0)
+    emotions = sorted(get_class_to_arg('KDEF'))
+    height, width = image_shape
+    gradient = np.linspace(0, 200, width, dtype=np.float32)[None, :, None]
+    for image_arg in range(num_images):
+        session = 'AF%02d' % (image_arg // 98)
+        folder = os.path.join(directory, session)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        emotion = emotions[image_arg % len(emotions)]
+        if image_arg % 500 == 499:
+            emotion = 'XX'
+        noise = random_state.randint(0, 56, (height // 8, width // 8, 3))
+        image = cv2.resize(noise.astype(np.uint8), (width, height)) + gradient
+        filename = '%s%s%02d.JPG' % (session, emotion, image_arg % 98)
+        cv2.imwrite(os.path.join(folder, filename), image.astype(np.uint8))
+
+
+def load_serial(dataset_path, image_size):
+    """The original DataManager._load_KDEF"""
+    class_to_arg = get_class_to_arg('KDEF')
+    num_classes = len(class_to_arg)
+    file_paths = []
+    for folder, subfolders, filenames in os.walk(dataset_path):
+        for filename in filenames:
+            if filename.lower().endswith(('.jpg')):
+                file_paths.append(os.path.join(folder, filename))
+    num_faces = len(file_paths)
+    y_size, x_size = image_size
+    faces = np.zeros(shape=(num_faces, y_size, x_size))
+    emotions = np.zeros(shape=(num_faces, num_classes))
+    for file_arg, file_path in enumerate(file_paths):
+        image_array = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
+        image_array = cv2.resize(image_array, (y_size, x_size))
+        faces[file_arg] = image_array
+        file_emotion = os.path.basename(file_path)[4:6]
+        try:
+            emotion_arg = class_to_arg[file_emotion]
+        except:
+            continue
+        emotions[file_arg, emotion_arg] = 1
+    faces = np.expand_dims(faces, -1)
+    return faces, emotions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--images', type=int, default=3000)
+    parser.add_argument('--size', type=int, default=64)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+    image_size = (args.size, args.size)
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_synthetic_kdef(directory, args.images)
+        print(f"{args.images} JPEGs -> {args.size}x{args.size}, "
+              f"{os.cpu_count()} cores\n")
+
+        start = time.perf_counter()
+        reference_faces, reference_emotions = load_serial(directory, image_size)
+        serial = time.perf_counter() - start
+        labeled = reference_emotions.any(axis=1)
+        print(f"{'serial loop':<16}{serial:>8.2f} s   "
+              f"{len(labeled)} rows, {np.sum(~labeled)} all-zero labels")
+
+        for num_workers in args.workers:
+            data_loader = DataManager('KDEF', directory, image_size,
+                                      use_cache=False, num_workers=num_workers)
+            start = time.perf_counter()
+            faces, emotions = data_loader.get_data()
+            parallel = time.perf_counter() - start
+            assert np.array_equal(faces, reference_faces[labeled]), 'faces differ'
+            assert np.array_equal(emotions, reference_emotions[labeled]), \
+                'labels differ'
+            print(f"{'%d workers' % num_workers:<16}{parallel:>8.2f} s   "
+                  f"{len(faces)} rows ({serial / parallel:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
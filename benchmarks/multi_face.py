@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Per-frame cost of classifying N faces: one predict() per face (the old
+emotions.py loop) vs. classify_faces() with a single batched forward pass.
+
+Usage: python -m benchmarks.multi_face [--faces 1 2 4 8] [--iterations 50]
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from config import get_config
+from utils.datasets import get_labels
+from utils.emotion_classifier import load_emotion_classifier
+from utils.inference import FaceBatchBuilder, apply_offsets, classify_faces
+from utils.preprocessor import preprocess_input
+from benchmarks.face_tracking import load_gray_frames
+
+
+def classify_each(emotion_classifier, gray_image, faces, emotion_labels,
+                  emotion_offsets):
+    emotion_texts = []
+    for face_coordinates in faces:
+        x1, x2, y1, y2 = apply_offsets(face_coordinates, emotion_offsets)
+        gray_face = gray_image[max(y1, 0):y2, max(x1, 0):x2]
+        gray_face = cv2.resize(gray_face, emotion_classifier.target_size)
+        gray_face = preprocess_input(gray_face, True)
+        gray_face = np.expand_dims(np.expand_dims(gray_face, 0), -1)
+        emotion_prediction = emotion_classifier.predict(gray_face)
+        emotion_texts.append(emotion_labels[np.argmax(emotion_prediction)])
+    return emotion_texts
+
+
+def tile_faces(gray_image, num_faces):
+    """Boxes spread over the frame, standing in for a panel of people"""
+    image_height, image_width = gray_image.shape[:2]
+    side = min(image_width, image_height) // 4
+    columns = int(np.ceil(np.sqrt(num_faces)))
+    return np.array([[(face_arg % columns) * image_width // columns,
+                      (face_arg // columns) * image_height // columns,
+                      side, side] for face_arg in range(num_faces)])
+
+
+def time_per_frame(function, iterations, *args):
+    function(*args)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function(*args)
+    return (time.perf_counter() - start) / iterations * 1000
+
+
+def main():
+    config_class = get_config()
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--faces', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--iterations', type=int, default=50)
+    args = parser.parse_args()
+
+    emotion_labels = get_labels(config_class.EMOTION_LABELS_DATASET)
+    emotion_offsets = config_class.EMOTION_OFFSETS
+    emotion_classifier = load_emotion_classifier(
+        str(config_class.EMOTION_MODEL_PATH), 'keras').warm_up(
+        range(1, max(args.faces) + 1))
+    face_batch_builder = FaceBatchBuilder(emotion_classifier.target_size,
+                                          emotion_offsets)
+    gray_image = load_gray_frames(1, config_class.VIDEO_WIDTH)[0]
+
+    print(f"{'faces':>6}{'per-face ms':>14}{'batched ms':>13}{'speedup':>10}")
+    for num_faces in args.faces:
+        faces = tile_faces(gray_image, num_faces)
+        per_face = time_per_frame(classify_each, args.iterations,
+                                  emotion_classifier, gray_image, faces,
+                                  emotion_labels, emotion_offsets)
+        batched = time_per_frame(classify_faces, args.iterations,
+                                 emotion_classifier, face_batch_builder,
+                                 gray_image, faces, emotion_labels)
+        print(f"{num_faces:>6}{per_face:>14.2f}{batched:>13.2f}"
+              f"{per_face / batched:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+ImageGenerator.flow throughput: the single-threaded generator vs.
+PrefetchingGenerator with 1, 2, 4 and 8 worker processes, on a synthetic
+directory of JPEGs. --step-ms stands in for the training step that the
+consumer spends on each batch (e.g. on an accelerator).
+
+Usage: python -m benchmarks.prefetching [--images 1024] [--batches 40] [--workers 1 2 4 8] [--step-ms 20]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from utils.data_augmentation import ImageGenerator, PrefetchingGenerator
+
+
+def write_synthetic_images(directory, num_images, image_shape=(256, 256)):
+    random_state = np.random.RandomState(0)
+    height, width = image_shape
+    keys = []
+    for image_arg in range(num_images):
+        noise = random_state.randint(0, 256, (height // 8, width // 8, 3))
+        image = cv2.resize(noise.astype(np.uint8), (width, height))
+        key = '%05d.jpg' % image_arg
+        cv2.imwrite(os.path.join(directory, key), image)
+        keys.append(key)
+    return keys
+
+
+def batches_per_second(batches, num_batches, step_seconds):
+    next(batches)
+    start = time.perf_counter()
+    for _ in range(num_batches):
+        next(batches)
+        time.sleep(step_seconds)
+    return num_batches / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--images', type=int, default=1024)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--size', type=int, default=64)
+    parser.add_argument('--batches', type=int, default=40)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--step-ms', type=float, default=20.0)
+    parser.add_argument('--batch-transform', action='store_true')
+    args = parser.parse_args()
+    step_seconds = args.step_ms / 1000.0
+
+    with tempfile.TemporaryDirectory() as directory:
+        keys = write_synthetic_images(directory, args.images)
+        ground_truth_data = {key: key_arg % 2 for key_arg, key in enumerate(keys)}
+        image_generator = ImageGenerator(
+            ground_truth_data, args.batch_size, (args.size, args.size), keys,
+            [], path_prefix=directory + os.sep, grayscale=True,
+            batch_transform=args.batch_transform)
+        print(f"{args.images} 256x256 JPEGs -> batches of {args.batch_size} "
+              f"at {args.size}x{args.size}, {args.step_ms:.0f} ms per step, "
+              f"{os.cpu_count()} cores\n")
+
+        current = batches_per_second(image_generator.flow('train'),
+                                     args.batches, step_seconds)
+        print(f"{'flow':<16}{current:>8.1f} batches/s"
+              f"{current * args.batch_size:>8.0f} images/s")
+        for num_workers in args.workers:
+            with PrefetchingGenerator(image_generator, 'train', num_workers,
+                                      max_prefetch=2 * num_workers,
+                                      seed=0) as batches:
+                prefetched = batches_per_second(batches, args.batches,
+                                                step_seconds)
+            print(f"{'%d workers' % num_workers:<16}{prefetched:>8.1f} "
+                  f"batches/s{prefetched * args.batch_size:>8.0f} images/s"
+                  f"   ({prefetched / current:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Face crop preprocessing: cv2.resize + preprocess_input + expand_dims vs.
+preprocess_input_into writing into a reused batch buffer.
+
+Usage: python -m benchmarks.preprocessing [--iterations 20000] [--size 64]
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from config import get_config
+from utils.inference import apply_offsets
+from utils.preprocessor import preprocess_input, preprocess_input_into
+from benchmarks.face_tracking import load_gray_frames
+
+
+def current_path(gray_face, target_size):
+    gray_face = cv2.resize(gray_face, target_size)
+    gray_face = preprocess_input(gray_face, True)
+    gray_face = np.expand_dims(gray_face, 0)
+    return np.expand_dims(gray_face, -1)
+
+
+def time_per_call(function, iterations, *args):
+    function(*args)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function(*args)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    config_class = get_config()
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    parser.add_argument('--size', type=int, default=64,
+                        help='classifier input side (64 for the shipped model)')
+    args = parser.parse_args()
+
+    gray_image = load_gray_frames(1, config_class.VIDEO_WIDTH)[0]
+    image_height, image_width = gray_image.shape
+    face_coordinates = (image_width // 3, image_height // 4,
+                        image_width // 4, image_width // 4)
+    x1, x2, y1, y2 = apply_offsets(face_coordinates, config_class.EMOTION_OFFSETS)
+    gray_face = np.ascontiguousarray(gray_image[max(y1, 0):y2, max(x1, 0):x2])
+    target_size = (args.size, args.size)
+
+    batch = np.empty((1, args.size, args.size, 1), dtype=np.float32)
+    resized = np.empty(target_size, dtype=np.uint8)
+    reference = current_path(gray_face, target_size)
+    preprocess_input_into(gray_face, batch[0], True, resized)
+    assert np.allclose(reference, batch, atol=1e-6), 'fused path differs'
+
+    current = time_per_call(current_path, args.iterations, gray_face,
+                            target_size)
+    fused = time_per_call(preprocess_input_into, args.iterations, gray_face,
+                          batch[0], True, resized)
+    print(f"{gray_face.shape[1]}x{gray_face.shape[0]} crop -> "
+          f"{args.size}x{args.size}, {args.iterations} iterations\n")
+    print(f"{'resize + preprocess_input':<30}{current:>8.2f} us")
+    print(f"{'preprocess_input_into':<30}{fused:>8.2f} us   "
+          f"({current / fused:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
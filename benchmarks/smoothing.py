@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Per-update cost of EmotionSmoother vs. the list + pop(0) + statistics.mode
+window that emotions.py used, across window sizes.
+
+Usage: python -m benchmarks.smoothing [--updates 20000] [--windows 10 30 100]
+"""
+
+import argparse
+import time
+from statistics import mode
+
+import numpy as np
+
+from utils.datasets import get_labels
+from utils.smoothing import SMOOTHING_MODES, EmotionSmoother
+
+
+def list_window(emotion_labels, predictions, window_size):
+    emotion_window = []
+    smoothed = []
+    for emotion_prediction in predictions:
+        emotion_window.append(emotion_labels[np.argmax(emotion_prediction)])
+        if len(emotion_window) > window_size:
+            emotion_window.pop(0)
+        smoothed.append(mode(emotion_window))
+    return smoothed
+
+
+def smoother_window(emotion_labels, predictions, window_size, smoothing):
+    emotion_smoother = EmotionSmoother(len(emotion_labels), window_size,
+                                       smoothing)
+    return [emotion_labels[emotion_smoother.update(emotion_prediction)]
+            for emotion_prediction in predictions]
+
+
+def time_per_update(function, predictions, *args):
+    start = time.perf_counter()
+    function(*args)
+    return (time.perf_counter() - start) / len(predictions) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--updates', type=int, default=20000)
+    parser.add_argument('--windows', type=int, nargs='+', default=[10, 30, 100])
+    args = parser.parse_args()
+
+    emotion_labels = get_labels('fer2013')
+    random_state = np.random.RandomState(0)
+    predictions = random_state.dirichlet(np.ones(len(emotion_labels)) * 0.3,
+                                         args.updates).astype(np.float32)
+
+    print(f"{args.updates} updates, microseconds per update\n")
+    print(f"{'window':>8}{'list+mode':>12}" +
+          ''.join(f"{smoothing:>10}" for smoothing in SMOOTHING_MODES) +
+          f"{'mode agrees':>13}")
+    for window_size in args.windows:
+        row = f"{window_size:>8}"
+        row += f"{time_per_update(list_window, predictions, emotion_labels, predictions, window_size):>12.2f}"
+        for smoothing in SMOOTHING_MODES:
+            row += f"{time_per_update(smoother_window, predictions, emotion_labels, predictions, window_size, smoothing):>10.2f}"
+
+        # both break ties by the first occurrence in the window
+        reference = list_window(emotion_labels, predictions, window_size)
+        smoothed = smoother_window(emotion_labels, predictions, window_size,
+                                   'mode')
+        agreement = np.mean([a == b for a, b in zip(reference, smoothed)])
+        row += f"{agreement:>13.1%}"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
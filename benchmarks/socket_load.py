@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Socket.IO load test: join_interview and submit_answer latency while many
+sessions stream emotion frames.
+
+Starts the app in a subprocess, then a probe client measures the round
+trips join_interview -> interview_started and submit_answer ->
+next_question, first with the server idle and then while --sessions
+clients stream frames from demo/dinner.mp4. The server emits every
+prediction regardless of confidence, so the emotion_detected rate counts
+all frames that made it through the worker pool. Streaming clients slow
+down on capture_throttle like the browser clients do.
+
+Usage: python -m benchmarks.socket_load [--sessions 100] [--frame-interval 0.5]
+"""
+
+import argparse
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+import socketio
+
+from config import get_config, EMOTION_CONFIG
+from benchmarks.capture_profiles import encode_for_profile
+
+LOAD_TEST_ORG_ID = 'load-test'
+VIDEO_PATH = './demo/dinner.mp4'
+
+
+def load_frame_with_face(profile):
+    """First demo frame with a detectable face once encoded for `profile`,
+    since a webcam interview frame almost always contains one."""
+    face_cascade = cv2.CascadeClassifier(str(get_config().FACE_CASCADE_PATH))
+    capture = cv2.VideoCapture(VIDEO_PATH)
+    frame_data = None
+    while capture.isOpened():
+        ret, bgr_image = capture.read()
+        if not ret:
+            break
+        frame_data = encode_for_profile(bgr_image, profile)
+        gray_image = cv2.imdecode(frame_data, cv2.IMREAD_GRAYSCALE)
+        faces = face_cascade.detectMultiScale(
+            gray_image,
+            scaleFactor=EMOTION_CONFIG['face_detection_scale_factor'],
+            minNeighbors=EMOTION_CONFIG['face_detection_min_neighbors'],
+            minSize=EMOTION_CONFIG['face_detection_min_size'])
+        if len(faces) > 0:
+            break
+    capture.release()
+    return frame_data.tobytes()
+
+
+def serve(port):
+    import app as interview_app
+
+    interview_app.EMOTION_CONFIG['detection_confidence_threshold'] = 0.0
+    interview_app.organization_questions[LOAD_TEST_ORG_ID] = [
+        f"Load test question {number}?" for number in range(10000)]
+    interview_app.socketio.run(interview_app.app, host='127.0.0.1', port=port,
+                               debug=False, use_reloader=False,
+                               log_output=False)
+
+
+def wait_for_server(url, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        client = socketio.Client()
+        try:
+            client.connect(url, transports=['websocket'], wait_timeout=5)
+            client.disconnect()
+            return
+        except Exception:
+            time.sleep(1)
+    raise Exception('Server did not start within %d seconds' % timeout)
+
+
+def stream_frames(url, frame_data, interval, started, stop_event, detected,
+                  throttles):
+    """Stream frames like the browser client, honouring capture_throttle"""
+    intervals = [interval]
+
+    def on_throttle(data):
+        throttles.put(data)
+        intervals.append(data['interval_ms'] / 1000.0)
+
+    client = socketio.Client()
+    client.on('emotion_detected', lambda data: detected.put(data))
+    client.on('capture_throttle', on_throttle)
+    client.connect(url, transports=['websocket'], wait_timeout=30)
+    client.emit('join_interview', {'user_type': 'candidate',
+                                   'org_id': LOAD_TEST_ORG_ID})
+    client.emit('start_question')
+    started.release()
+    while not stop_event.is_set():
+        client.emit('emotion_frame', {'frame': frame_data})
+        stop_event.wait(intervals[-1])
+    client.disconnect()
+
+
+def measure_latencies(url, rounds):
+    replies = queue.Queue()
+    client = socketio.Client()
+    client.on('interview_started', lambda data: replies.put(time.perf_counter()))
+    client.on('next_question', lambda data: replies.put(time.perf_counter()))
+    client.connect(url, transports=['websocket'], wait_timeout=30)
+
+    join_latencies, submit_latencies = [], []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        client.emit('join_interview', {'user_type': 'candidate',
+                                       'org_id': LOAD_TEST_ORG_ID})
+        join_latencies.append(replies.get(timeout=30) - start)
+
+        client.emit('start_question')
+        start = time.perf_counter()
+        client.emit('submit_answer', {'answer': 'load test answer'})
+        submit_latencies.append(replies.get(timeout=30) - start)
+    client.disconnect()
+    return np.array(join_latencies) * 1000, np.array(submit_latencies) * 1000
+
+
+def report(phase, join_latencies, submit_latencies):
+    for name, latencies in (('join_interview', join_latencies),
+                            ('submit_answer', submit_latencies)):
+        print(f"{phase:<10}{name:<16}median {np.median(latencies):7.2f} ms   "
+              f"p95 {np.percentile(latencies, 95):7.2f} ms   "
+              f"max {latencies.max():7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--sessions', type=int, default=100)
+    parser.add_argument('--frame-interval', type=float, default=0.5,
+                        help='seconds between frames per streaming session')
+    parser.add_argument('--rounds', type=int, default=50)
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.port)
+        return
+
+    url = f"http://127.0.0.1:{args.port}"
+    server = subprocess.Popen([sys.executable, '-m', 'benchmarks.socket_load',
+                               '--serve', '--port', str(args.port)])
+    try:
+        wait_for_server(url)
+        config_class = get_config()
+        profile = config_class.CAPTURE_PROFILES[config_class.CAPTURE_PROFILE]
+        frame_data = load_frame_with_face(profile)
+
+        report('idle', *measure_latencies(url, args.rounds))
+
+        stop_event = threading.Event()
+        started = threading.Semaphore(0)
+        detected = queue.Queue()
+        throttles = queue.Queue()
+        streamers = [threading.Thread(target=stream_frames,
+                                      args=(url, frame_data, args.frame_interval,
+                                            started, stop_event, detected,
+                                            throttles))
+                     for _ in range(args.sessions)]
+        for streamer in streamers:
+            streamer.daemon = True
+            streamer.start()
+        for _ in streamers:
+            started.acquire()
+        print(f"\n{args.sessions} sessions streaming "
+              f"{args.sessions / args.frame_interval:.0f} frames/s "
+              f"({len(frame_data)} bytes each)\n")
+
+        start = time.time()
+        report('loaded', *measure_latencies(url, args.rounds))
+        print(f"\nemotion_detected events delivered while loaded: "
+              f"{detected.qsize() / (time.time() - start):.1f}/s")
+        print(f"capture_throttle events received: {throttles.qsize()}")
+        stop_event.set()
+        for streamer in streamers:
+            streamer.join(timeout=10)
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == '__main__':
+    main()
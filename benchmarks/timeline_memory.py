@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Memory per emotion sample: list of dicts vs. the array-backed EmotionTimeline.
+
+Simulates one interview of --minutes minutes with a detection every
+--interval seconds and measures the allocations of each representation
+with tracemalloc.
+
+Usage: python -m benchmarks.timeline_memory [--minutes 60] [--interval 0.5]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from utils.datasets import get_labels
+from utils.timeline import EmotionTimeline
+
+QUESTION_SECONDS = 180
+
+
+def simulate_samples(num_samples, interval, num_classes, seed=0):
+    random_state = np.random.RandomState(seed)
+    probabilities = random_state.dirichlet(np.ones(num_classes), num_samples)
+    timestamps = time.time() + np.arange(num_samples) * interval
+    question_indices = (np.arange(num_samples) * interval //
+                        QUESTION_SECONDS).astype(int)
+    return probabilities.astype(np.float32), timestamps, question_indices
+
+
+def measure(fill):
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    storage = fill()
+    used = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    return storage, used
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--minutes', type=float, default=60)
+    parser.add_argument('--interval', type=float, default=0.5,
+                        help='seconds between emotion samples')
+    args = parser.parse_args()
+
+    emotion_labels = get_labels('fer2013')
+    num_samples = int(args.minutes * 60 / args.interval)
+    probabilities, timestamps, question_indices = simulate_samples(
+        num_samples, args.interval, len(emotion_labels))
+    label_args = probabilities.argmax(axis=1)
+    # Python scalars as the app sees them, so only the storage is measured
+    samples = list(zip(label_args.tolist(), timestamps.tolist(),
+                       question_indices.tolist()))
+
+    def fill_dicts():
+        emotions_data = []
+        for label_arg, timestamp, question_index in samples:
+            emotions_data.append({
+                'emotion': emotion_labels[label_arg],
+                'timestamp': timestamp,
+                'question_index': question_index
+            })
+        return emotions_data
+
+    def fill_timeline(store_probabilities):
+        timeline = EmotionTimeline(len(emotion_labels),
+                                   store_probabilities=store_probabilities)
+        for sample_arg, (label_arg, timestamp, question_index) in enumerate(
+                samples):
+            timeline.append(label_arg, timestamp, question_index,
+                            probabilities[sample_arg])
+        return timeline
+
+    print(f"{num_samples} samples ({args.minutes:g} min, one every "
+          f"{args.interval:g} s)\n")
+    print(f"{'storage':<32}{'total':>12}{'bytes/sample':>14}")
+    for name, fill in (
+            ('list of dicts', fill_dicts),
+            ('EmotionTimeline', lambda: fill_timeline(False)),
+            ('EmotionTimeline + float16 probs', lambda: fill_timeline(True))):
+        storage, used = measure(fill)
+        print(f"{name:<32}{used / 1024.0:>10.1f} kB{used / float(num_samples):>14.1f}")
+        del storage
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+One video through decode -> detect -> classify: sequential frame loop vs.
+the pipelined stages of analyze_frame_range_pipelined.
+
+Usage: python -m benchmarks.video_pipeline [--video demo/dinner.mp4] [--frames 150] [--detection-threads 1 2 4]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from config import get_config, EMOTION_CONFIG
+from utils.video_analysis import (analyze_frame_range,
+                                  analyze_frame_range_pipelined,
+                                  count_video_frames, init_video_worker)
+
+
+def main():
+    config_class = get_config()
+    parser = argparse.ArgumentParser(description=__doc__.strip().split('\n')[0])
+    parser.add_argument('--video', default='demo/dinner.mp4')
+    parser.add_argument('--frames', type=int, default=150)
+    parser.add_argument('--stride', type=int, default=1)
+    parser.add_argument('--detection-threads', type=int, nargs='+',
+                        default=[1, 2, 4])
+    args = parser.parse_args()
+
+    detection_params = {
+        'scale_factor': EMOTION_CONFIG['face_detection_scale_factor'],
+        'min_neighbors': EMOTION_CONFIG['face_detection_min_neighbors'],
+        'min_size': EMOTION_CONFIG['face_detection_min_size'],
+        'confidence_threshold': EMOTION_CONFIG['dnn_face_confidence_threshold']
+    }
+    init_video_worker(str(config_class.EMOTION_MODEL_PATH), 'keras',
+                      config_class.FACE_DETECTOR,
+                      str(config_class.FACE_DETECTOR_MODEL_PATHS[config_class.FACE_DETECTOR]),
+                      str(config_class.DNN_FACE_PROTOTXT_PATH), detection_params,
+                      config_class.EMOTION_OFFSETS,
+                      config_class.EMOTION_LABELS_DATASET)
+    num_frames, _ = count_video_frames(args.video)
+    end_frame = min(args.frames, num_frames)
+    # first call traces the model for the batch sizes used below
+    analyze_frame_range_pipelined(args.video, 0, min(10, end_frame))
+
+    start = time.perf_counter()
+    reference = analyze_frame_range(args.video, 0, end_frame, args.stride)
+    sequential = reference[3] / (time.perf_counter() - start)
+    print(f"{args.video}, {reference[3]} frames, {len(reference[0])} faces, "
+          f"{os.cpu_count()} cores\n")
+    print(f"{'sequential':<24}{sequential:>8.1f} frames/s")
+
+    for detection_threads in args.detection_threads:
+        start = time.perf_counter()
+        result = analyze_frame_range_pipelined(args.video, 0, end_frame,
+                                               args.stride, detection_threads)
+        pipelined = result[3] / (time.perf_counter() - start)
+        assert np.array_equal(reference[0], result[0]), 'frames differ'
+        assert np.allclose(reference[2], result[2], atol=1e-2), \
+            'probabilities differ'
+        print(f"{'pipelined, %d detect' % detection_threads:<24}"
+              f"{pipelined:>8.1f} frames/s   ({pipelined / sequential:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -26,6 +26,35 @@ class Config:
     EMOTION_MODEL_PATH = MODELS_DIR / 'emotion_model.hdf5'
     FACE_CASCADE_PATH = MODELS_DIR / 'haarcascade_frontalface_default.xml'
     
+    # Face detector: 'haar', 'lbp' or 'dnn' (res10 SSD through cv2.dnn);
+    # the LBP and DNN model files are downloaded by install.py
+    FACE_DETECTOR = os.environ.get('FACE_DETECTOR', 'haar')
+    LBP_CASCADE_PATH = MODELS_DIR / 'lbpcascade_frontalface_improved.xml'
+    DNN_FACE_PROTOTXT_PATH = MODELS_DIR / 'deploy.prototxt'
+    DNN_FACE_MODEL_PATH = MODELS_DIR / 'res10_300x300_ssd_iter_140000.caffemodel'
+    FACE_DETECTOR_MODEL_PATHS = {
+        'haar': FACE_CASCADE_PATH,
+        'lbp': LBP_CASCADE_PATH,
+        'dnn': DNN_FACE_MODEL_PATH
+    }
+    
+    # Emotion inference backend: 'keras', 'tflite', 'tflite_int8' or 'onnx'
+    # (run `python convert_model.py --backend <name>` once before switching,
+    # or `python quantize_model.py` for 'tflite_int8')
+    EMOTION_BACKEND = os.environ.get('EMOTION_BACKEND', 'keras')
+    EMOTION_TFLITE_MODEL_PATH = MODELS_DIR / 'emotion_model.tflite'
+    EMOTION_INT8_MODEL_PATH = MODELS_DIR / 'emotion_model_int8.tflite'
+    EMOTION_INT8_REPORT_PATH = MODELS_DIR / 'emotion_model_int8.json'
+    EMOTION_ONNX_MODEL_PATH = MODELS_DIR / 'emotion_model.onnx'
+    EMOTION_BACKEND_MODEL_PATHS = {
+        'keras': EMOTION_MODEL_PATH,
+        'tflite': EMOTION_TFLITE_MODEL_PATH,
+        'tflite_int8': EMOTION_INT8_MODEL_PATH,
+        'onnx': EMOTION_ONNX_MODEL_PATH
+    }
+    EMOTION_BACKEND_MIN_AGREEMENT = 0.99  # top-1 parity with Keras output
+    EMOTION_INT8_MIN_AGREEMENT = 0.95  # refuse the int8 model below this
+    
     # Emotion detection settings
     EMOTION_LABELS_DATASET = 'fer2013'
     EMOTION_OFFSETS = (20, 40)
@@ -51,6 +80,18 @@ class Config:
     VIDEO_FPS = 30
     CANVAS_JPEG_QUALITY = 0.8
     
+    # Capture profile advertised to candidates on interview_started; the
+    # client downscales each frame to fit width x height before encoding
+    CAPTURE_PROFILE = os.environ.get('CAPTURE_PROFILE', 'reduced')
+    CAPTURE_PROFILES = {
+        'full': {'width': VIDEO_WIDTH, 'height': VIDEO_HEIGHT,
+                 'grayscale': False, 'jpeg_quality': CANVAS_JPEG_QUALITY},
+        'reduced': {'width': 320, 'height': 240,
+                    'grayscale': True, 'jpeg_quality': CANVAS_JPEG_QUALITY},
+        'minimal': {'width': 160, 'height': 120,
+                    'grayscale': True, 'jpeg_quality': 0.7}
+    }
+    
     # Session settings
     SESSION_TIMEOUT = 3600  # 1 hour in seconds
     MAX_CONCURRENT_SESSIONS = 100
@@ -71,6 +112,14 @@ class Config:
     THEME_SECONDARY_COLOR = '#764ba2'
     ANIMATION_DURATION = 300  # milliseconds
     
+    @classmethod
+    def get_capture_profile(cls):
+        """Capture settings sent to the client, including the send interval"""
+        profile = dict(cls.CAPTURE_PROFILES.get(cls.CAPTURE_PROFILE,
+                                                cls.CAPTURE_PROFILES['full']))
+        profile['interval_ms'] = int(cls.EMOTION_DETECTION_INTERVAL * 1000)
+        return profile
+    
     @classmethod
     def validate_config(cls):
         """Validate configuration settings"""
@@ -80,9 +129,33 @@ class Config:
         if not cls.EMOTION_MODEL_PATH.exists():
             errors.append(f"Emotion model not found: {cls.EMOTION_MODEL_PATH}")
         
+        if cls.EMOTION_BACKEND not in cls.EMOTION_BACKEND_MODEL_PATHS:
+            errors.append(f"Unknown emotion backend: {cls.EMOTION_BACKEND}")
+        elif not cls.EMOTION_BACKEND_MODEL_PATHS[cls.EMOTION_BACKEND].exists():
+            errors.append(f"{cls.EMOTION_BACKEND} emotion model not found: "
+                          f"{cls.EMOTION_BACKEND_MODEL_PATHS[cls.EMOTION_BACKEND]} "
+                          f"(see EMOTION_BACKEND in config.py)")
+        
         if not cls.FACE_CASCADE_PATH.exists():
             errors.append(f"Face cascade not found: {cls.FACE_CASCADE_PATH}")
         
+        if cls.FACE_DETECTOR not in cls.FACE_DETECTOR_MODEL_PATHS:
+            errors.append(f"Unknown face detector: {cls.FACE_DETECTOR}")
+        elif not cls.FACE_DETECTOR_MODEL_PATHS[cls.FACE_DETECTOR].exists():
+            errors.append(f"{cls.FACE_DETECTOR} face detector model not found: "
+                          f"{cls.FACE_DETECTOR_MODEL_PATHS[cls.FACE_DETECTOR]}")
+        elif (cls.FACE_DETECTOR == 'dnn' and
+                not cls.DNN_FACE_PROTOTXT_PATH.exists()):
+            errors.append(f"DNN face detector prototxt not found: "
+                          f"{cls.DNN_FACE_PROTOTXT_PATH}")
+        
+        if cls.CAPTURE_PROFILE not in cls.CAPTURE_PROFILES:
+            errors.append(f"Unknown capture profile: {cls.CAPTURE_PROFILE}")
+        
+        if EMOTION_CONFIG['emotion_smoothing'] not in ('mode', 'mean', 'ema'):
+            errors.append(f"Unknown emotion smoothing: "
+                          f"{EMOTION_CONFIG['emotion_smoothing']}")
+        
         # Check directories
         required_dirs = [cls.MODELS_DIR, cls.TEMPLATES_DIR, cls.STATIC_DIR]
         for directory in required_dirs:
@@ -150,7 +223,26 @@ EMOTION_CONFIG = {
     'face_detection_scale_factor': 1.1,
     'face_detection_min_neighbors': 5,
     'face_detection_min_size': (30, 30),
+    'dnn_face_confidence_threshold': 0.5,
+    'face_tracking_enabled': True,
+    'face_tracking_redetect_interval': 10,  # full-frame detection every N frames
+    'face_tracking_search_margin': 0.5,  # search ROI padding, fraction of face size
+    'face_tracking_size_tolerance': 0.3,  # allowed face size change between frames
+    'face_adaptive_detection_enabled': True,
+    'face_adaptive_warmup_detections': 5,  # unrestricted detections before learning
+    'face_adaptive_size_margin': 0.3,  # widen the learned face size range by this
+    'face_adaptive_region_margin': 0.5,  # pad the learned ROI, fraction of face size
     'emotion_window_size': 10,
+    'emotion_smoothing': 'mode',  # 'mode', 'mean' or 'ema' over the window
+    'emotion_ema_alpha': 0.3,
+    'inference_max_batch_size': 32,
+    'inference_max_wait_ms': 5,
+    'frame_analysis_workers': 4,  # native threads decoding/detecting frames, at most one per core
+    'frame_analysis_max_pending': 64,  # sessions waiting for a worker; more drop frames
+    'emit_relay_interval_ms': 10,  # poll interval for events sent from workers
+    'capture_throttle_max_factor': 8,  # slowest capture interval vs. the profile's
+    'capture_throttle_recovery_frames': 10,  # undropped frames before speeding up
+    'emotion_timeline_initial_capacity': 256,  # samples preallocated per session
     'supported_emotions': [
         'angry', 'disgust', 'fear', 'happy', 
         'sad', 'surprise', 'neutral'
@@ -191,6 +283,7 @@ WEBSOCKET_EVENTS = {
     'QUESTION_TIMEOUT': 'question_timeout',
     'INTERVIEW_COMPLETED': 'interview_completed',
     'EMOTION_DETECTED': 'emotion_detected',
+    'CAPTURE_THROTTLE': 'capture_throttle',
     'INTERVIEW_RESULTS': 'interview_results',
     'ERROR': 'error'
 }
\ No newline at end of file
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+One-time conversion of the Keras emotion model to a CPU inference backend
+(TensorFlow Lite or ONNX Runtime), followed by an accuracy-parity check
+against the Keras output on a fixed set of face crops.
+
+Usage: python convert_model.py --backend tflite|onnx [--skip-check]
+"""
+
+import argparse
+import sys
+
+import cv2
+import numpy as np
+
+from config import get_config, EMOTION_CONFIG
+from utils.emotion_classifier import (EmotionClassifier, compare_classifiers,
+                                      convert_emotion_model,
+                                      load_emotion_classifier)
+from utils.inference import apply_offsets
+from utils.preprocessor import preprocess_input
+
+PARITY_VIDEO_PATH = './demo/dinner.mp4'
+
+
+def load_parity_faces(target_size, num_faces=64, seed=0):
+    """Fixed set of preprocessed face crops: faces detected in the demo
+    video, topped up with seeded random crops if too few are found."""
+    config_class = get_config()
+    face_cascade = cv2.CascadeClassifier(str(config_class.FACE_CASCADE_PATH))
+    faces = []
+    capture = cv2.VideoCapture(PARITY_VIDEO_PATH)
+    while capture.isOpened() and len(faces) < num_faces:
+        ret, bgr_image = capture.read()
+        if not ret:
+            break
+        gray_image = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2GRAY)
+        detections = face_cascade.detectMultiScale(
+            gray_image,
+            scaleFactor=EMOTION_CONFIG['face_detection_scale_factor'],
+            minNeighbors=EMOTION_CONFIG['face_detection_min_neighbors'],
+            minSize=EMOTION_CONFIG['face_detection_min_size'])
+        for face_coordinates in detections:
+            x1, x2, y1, y2 = apply_offsets(face_coordinates,
+                                           config_class.EMOTION_OFFSETS)
+            gray_face = gray_image[max(y1, 0):y2, max(x1, 0):x2]
+            faces.append(cv2.resize(gray_face, target_size))
+    capture.release()
+
+    random_state = np.random.RandomState(seed)
+    while len(faces) < num_faces:
+        faces.append(random_state.randint(0, 256, target_size, dtype=np.uint8))
+    faces = preprocess_input(np.asarray(faces[:num_faces]), True)
+    return np.expand_dims(faces, -1)
+
+
+def main():
+    config_class = get_config()
+    parser = argparse.ArgumentParser(
+        description='Convert the emotion model to a CPU inference backend')
+    parser.add_argument('--backend', required=True, choices=['tflite', 'onnx'])
+    parser.add_argument('--output', default=None,
+                        help='defaults to the path configured in config.py')
+    parser.add_argument('--skip-check', action='store_true',
+                        help='skip the accuracy-parity check')
+    args = parser.parse_args()
+
+    output_path = (args.output or
+                   str(config_class.EMOTION_BACKEND_MODEL_PATHS[args.backend]))
+    keras_model_path = str(config_class.EMOTION_MODEL_PATH)
+
+    print(f"Converting {keras_model_path} -> {output_path} ({args.backend})")
+    convert_emotion_model(keras_model_path, output_path, args.backend)
+    print("✓ Conversion finished")
+
+    if args.skip_check:
+        return
+
+    print("\nChecking accuracy parity against Keras...")
+    reference = EmotionClassifier(keras_model_path)
+    candidate = load_emotion_classifier(output_path, args.backend)
+    faces = load_parity_faces(reference.target_size)
+    agreement, max_error = compare_classifiers(reference, candidate, faces)
+    print(f"Face crops:            {len(faces)}")
+    print(f"Top-1 agreement:       {agreement:.2%}")
+    print(f"Max abs difference:    {max_error:.2e}")
+
+    if agreement < config_class.EMOTION_BACKEND_MIN_AGREEMENT:
+        print(f"✗ Agreement below {config_class.EMOTION_BACKEND_MIN_AGREEMENT:.0%}"
+              f" - do not switch EMOTION_BACKEND to {args.backend}")
+        sys.exit(1)
+    print(f"✓ Parity check passed - set EMOTION_BACKEND='{args.backend}'")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,16 @@
 import cv2
 import numpy as np
-from keras.models import load_model
-from statistics import mode
 from utils.datasets import get_labels
+from utils.emotion_classifier import EmotionClassifier
+from utils.face_detection import load_face_detector
 from utils.inference import detect_faces
 from utils.inference import draw_text
 from utils.inference import draw_bounding_box
-from utils.inference import apply_offsets
+from utils.inference import classify_faces
+from utils.inference import FaceBatchBuilder
 from utils.inference import load_detection_model
-from utils.preprocessor import preprocess_input
+from utils.smoothing import EmotionSmoother
+from config import get_config, EMOTION_CONFIG
 
 USE_WEBCAM = True # If false, loads video file source
 
@@ -17,18 +19,25 @@ emotion_model_path = './models/emotion_model.hdf5'
 emotion_labels = get_labels('fer2013')
 
 # hyper-parameters for bounding boxes shape
-frame_window = 10
+config_class = get_config()
+frame_window = config_class.FRAME_WINDOW
 emotion_offsets = (20, 40)
 
 # loading models
-face_cascade = cv2.CascadeClassifier('./models/haarcascade_frontalface_default.xml')
-emotion_classifier = load_model(emotion_model_path)
+face_detection = load_face_detector(
+    config_class.FACE_DETECTOR,
+    config_class.FACE_DETECTOR_MODEL_PATHS[config_class.FACE_DETECTOR],
+    prototxt_path=config_class.DNN_FACE_PROTOTXT_PATH)
+emotion_classifier = EmotionClassifier(emotion_model_path).warm_up()
 
 # getting input model shapes for inference
-emotion_target_size = emotion_classifier.input_shape[1:3]
+emotion_target_size = emotion_classifier.target_size
+face_batch_builder = FaceBatchBuilder(emotion_target_size, emotion_offsets)
 
-# starting lists for calculating modes
-emotion_window = []
+# smoothing the predicted emotion over the last frames
+emotion_smoother = EmotionSmoother(len(emotion_labels), frame_window,
+                                   EMOTION_CONFIG['emotion_smoothing'],
+                                   EMOTION_CONFIG['emotion_ema_alpha'])
 
 # starting video streaming
 
@@ -50,33 +59,18 @@ while cap.isOpened(): # True:
     gray_image = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2GRAY)
     rgb_image = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2RGB)
 
-    faces = face_cascade.detectMultiScale(gray_image, scaleFactor=1.1, minNeighbors=5,
-			minSize=(30, 30), flags=cv2.CASCADE_SCALE_IMAGE)
+    faces = face_detection(gray_image)
 
-    for face_coordinates in faces:
+    # one forward pass for all faces in the frame
+    emotion_texts, emotion_predictions = classify_faces(
+        emotion_classifier, face_batch_builder, gray_image, faces,
+        emotion_labels)
 
-        x1, x2, y1, y2 = apply_offsets(face_coordinates, emotion_offsets)
-        gray_face = gray_image[y1:y2, x1:x2]
-        try:
-            gray_face = cv2.resize(gray_face, (emotion_target_size))
-        except:
-            continue
+    for face_coordinates, emotion_text, emotion_prediction in zip(
+            faces, emotion_texts, emotion_predictions):
 
-        gray_face = preprocess_input(gray_face, True)
-        gray_face = np.expand_dims(gray_face, 0)
-        gray_face = np.expand_dims(gray_face, -1)
-        emotion_prediction = emotion_classifier.predict(gray_face)
         emotion_probability = np.max(emotion_prediction)
-        emotion_label_arg = np.argmax(emotion_prediction)
-        emotion_text = emotion_labels[emotion_label_arg]
-        emotion_window.append(emotion_text)
-
-        if len(emotion_window) > frame_window:
-            emotion_window.pop(0)
-        try:
-            emotion_mode = mode(emotion_window)
-        except:
-            continue
+        emotion_mode = emotion_labels[emotion_smoother.update(emotion_prediction)]
 
         if emotion_text == 'angry':
             color = emotion_probability * np.asarray((255, 0, 0))
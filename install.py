@@ -54,6 +54,32 @@ def check_model_files():
     
     return True
 
+OPTIONAL_MODEL_URLS = {
+    "lbpcascade_frontalface_improved.xml":
+        "https://raw.githubusercontent.com/opencv/opencv/4.x/data/lbpcascades/lbpcascade_frontalface_improved.xml",
+    "deploy.prototxt":
+        "https://raw.githubusercontent.com/opencv/opencv/4.x/samples/dnn/face_detector/deploy.prototxt",
+    "res10_300x300_ssd_iter_140000.caffemodel":
+        "https://raw.githubusercontent.com/opencv/opencv_3rdparty/dnn_samples_face_detector_20170830/res10_300x300_ssd_iter_140000.caffemodel"
+}
+
+def download_optional_models():
+    """Download the optional LBP and DNN face detector models (FACE_DETECTOR)"""
+    print("\nDownloading optional face detector models...")
+    
+    models_dir = Path("models")
+    for file_name, url in OPTIONAL_MODEL_URLS.items():
+        file_path = models_dir / file_name
+        if file_path.exists():
+            print(f"✓ {file_name} found")
+            continue
+        try:
+            urllib.request.urlretrieve(url, file_path)
+            print(f"✓ {file_name} downloaded")
+        except Exception as e:
+            print(f"⚠ Could not download {file_name}: {e}")
+            print("  Only FACE_DETECTOR = 'haar' will be available")
+
 def create_directories():
     """Create required directories if they don't exist"""
     print("\nCreating required directories...")
@@ -120,6 +146,7 @@ def main():
     
     # Check model files
     model_files_ok = check_model_files()
+    download_optional_models()
     
     # Display browser compatibility
     check_browser_compatibility()
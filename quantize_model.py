@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Post-training int8 quantization of the emotion model.
+
+Calibrates on FER2013 faces loaded through utils.datasets.DataManager,
+writes the int8 TFLite model and a JSON report with top-1 agreement
+against the float model, per-frame CPU latency and peak RSS. The server
+refuses to load the int8 model (EMOTION_BACKEND = 'tflite_int8') when the
+reported agreement is below EMOTION_INT8_MIN_AGREEMENT, or when the
+SHA-256 recorded in the report does not match the model file.
+
+Usage: python quantize_model.py [--dataset-path ../datasets/fer2013/fer2013.csv]
+"""
+
+import argparse
+import json
+import multiprocessing
+import resource
+import sys
+import time
+
+import numpy as np
+
+from config import get_config
+from utils.datasets import DataManager
+from utils.emotion_classifier import (EmotionClassifier, compare_classifiers,
+                                      load_emotion_classifier, model_sha256,
+                                      quantize_emotion_model)
+from utils.preprocessor import preprocess_input
+
+
+def measure_latency(classifier, faces, iterations=200):
+    face = faces[:1]
+    classifier.predict(face)
+    start = time.perf_counter()
+    for _ in range(iterations):
+        classifier.predict(face)
+    return (time.perf_counter() - start) / iterations * 1000.0
+
+
+def _peak_rss_mb(model_path, backend):
+    classifier = load_emotion_classifier(model_path, backend).warm_up()
+    classifier.predict(np.zeros((1,) + classifier.input_shape, np.float32))
+    # ru_maxrss is reported in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def measure_peak_rss(model_path, backend):
+    """Peak RSS of a fresh process that only loads and runs one model."""
+    context = multiprocessing.get_context('spawn')
+    with context.Pool(1) as pool:
+        return pool.apply(_peak_rss_mb, (model_path, backend))
+
+
+def main():
+    config_class = get_config()
+    parser = argparse.ArgumentParser(
+        description='Quantize the emotion model to int8 with an accuracy report')
+    parser.add_argument('--dataset-path', default=None,
+                        help='fer2013.csv (defaults to the DataManager path)')
+    parser.add_argument('--calibration-samples', type=int, default=500)
+    parser.add_argument('--eval-samples', type=int, default=2000)
+    parser.add_argument('--output', default=str(config_class.EMOTION_INT8_MODEL_PATH))
+    parser.add_argument('--report', default=str(config_class.EMOTION_INT8_REPORT_PATH))
+    args = parser.parse_args()
+
+    keras_model_path = str(config_class.EMOTION_MODEL_PATH)
+    float_classifier = EmotionClassifier(keras_model_path)
+
+    print("Loading FER2013 faces...")
+    data_loader = DataManager('fer2013', args.dataset_path,
+                              image_size=float_classifier.target_size)
+    # uint8 memory map: only the faces used below are converted to float32
+    train_data, val_data = data_loader.get_mapped_data().split()
+    # calibrate on the training split, report agreement on held-out faces
+    calibration_faces = preprocess_input(
+        train_data.get_batch(slice(args.calibration_samples))[0], True)
+    eval_faces = preprocess_input(
+        val_data.get_batch(slice(args.eval_samples))[0], True)
+
+    print(f"Quantizing with {len(calibration_faces)} calibration faces...")
+    quantize_emotion_model(keras_model_path, args.output, calibration_faces)
+    int8_classifier = load_emotion_classifier(args.output, 'tflite_int8')
+
+    agreement, max_error = compare_classifiers(float_classifier,
+                                               int8_classifier, eval_faces)
+    report = {
+        'model_path': args.output,
+        # the server only trusts this report for the exact same file
+        'model_sha256': model_sha256(args.output),
+        'calibration_samples': len(calibration_faces),
+        'eval_samples': len(eval_faces),
+        'top1_agreement': agreement,
+        'max_abs_difference': max_error,
+        'float_latency_ms': measure_latency(float_classifier, eval_faces),
+        'int8_latency_ms': measure_latency(int8_classifier, eval_faces),
+        'float_peak_rss_mb': measure_peak_rss(keras_model_path, 'keras'),
+        'int8_peak_rss_mb': measure_peak_rss(args.output, 'tflite_int8'),
+        'min_agreement': config_class.EMOTION_INT8_MIN_AGREEMENT,
+    }
+    with open(args.report, 'w') as report_file:
+        json.dump(report, report_file, indent=2)
+
+    print(f"\nTop-1 agreement:   {report['top1_agreement']:.2%} "
+          f"on {report['eval_samples']} held-out faces")
+    print(f"Latency (float):   {report['float_latency_ms']:.3f} ms/frame")
+    print(f"Latency (int8):    {report['int8_latency_ms']:.3f} ms/frame")
+    print(f"Peak RSS (float):  {report['float_peak_rss_mb']:.1f} MB")
+    print(f"Peak RSS (int8):   {report['int8_peak_rss_mb']:.1f} MB")
+    print(f"Report written to {args.report}")
+
+    if agreement < config_class.EMOTION_INT8_MIN_AGREEMENT:
+        print(f"✗ Agreement below {config_class.EMOTION_INT8_MIN_AGREEMENT:.0%};"
+              " the server will refuse to load this model")
+        sys.exit(1)
+    print("✓ Set EMOTION_BACKEND='tflite_int8' to serve the quantized model")
+
+
+if __name__ == '__main__':
+    main()
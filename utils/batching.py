@@ -0,0 +1,70 @@
+import queue
+import threading
+import time
+
+import numpy as np
+
+
+class BatchInferenceQueue(object):
+    """Shared inference queue that collects samples submitted by many
+    sessions and classifies them in a single batched forward pass.
+
+    Samples are gathered until either `max_batch_size` samples are pending
+    or `max_wait` seconds have passed since the first one arrived. Each
+    prediction is then handed to the callback registered with its sample,
+    which is how results are routed back to the submitting session.
+    """
+    def __init__(self, predict_fn, max_batch_size=32, max_wait=0.005):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait))
+        self._queue = queue.Queue()
+        self._worker = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._run,
+                                                name='batch-inference')
+                self._worker.daemon = True
+                self._worker.start()
+
+    def submit(self, sample, callback):
+        """Queue a single preprocessed sample; `callback(prediction)` is
+        called from the worker thread once its batch has been classified."""
+        self._queue.put((sample, callback))
+        self.start()
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def _collect_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect_batch()
+            samples = np.stack([sample for sample, _ in batch])
+            try:
+                predictions = self.predict_fn(samples)
+            except Exception as e:
+                print(f"Error in batched inference: {e}")
+                continue
+
+            for (_, callback), prediction in zip(batch, predictions):
+                try:
+                    callback(prediction)
+                except Exception as e:
+                    print(f"Error delivering inference result: {e}")
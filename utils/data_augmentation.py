@@ -1,3 +1,6 @@
+import multiprocessing
+import queue
+import random
 import numpy as np
 from random import shuffle
 from .preprocessor import preprocess_input
@@ -30,7 +33,8 @@ class ImageGenerator(object):
                 do_random_crop=False,
                 grayscale=False,
                 zoom_range=[0.75, 1.25],
-                translation_factor=.3):
+                translation_factor=.3,
+                batch_transform=False):
 
         self.ground_truth_data = ground_truth_data
         self.ground_truth_transformer = ground_truth_transformer
@@ -41,21 +45,28 @@ class ImageGenerator(object):
         self.image_size = image_size
         self.grayscale = grayscale
         self.color_jitter = []
+        self.batch_color_jitter = []
         if saturation_var:
             self.saturation_var = saturation_var
             self.color_jitter.append(self.saturation)
+            self.batch_color_jitter.append(self.saturation_batch)
         if brightness_var:
             self.brightness_var = brightness_var
             self.color_jitter.append(self.brightness)
+            self.batch_color_jitter.append(self.brightness_batch)
         if contrast_var:
             self.contrast_var = contrast_var
             self.color_jitter.append(self.contrast)
+            self.batch_color_jitter.append(self.contrast_batch)
         self.lighting_std = lighting_std
         self.horizontal_flip_probability = horizontal_flip_probability
         self.vertical_flip_probability = vertical_flip_probability
         self.do_random_crop = do_random_crop
         self.zoom_range = zoom_range
         self.translation_factor = translation_factor
+        self.batch_transform = batch_transform
+        self.lighting_eigen_values = None
+        self.lighting_eigen_vectors = None
 
     def _do_random_crop(self, image_array):
         """IMPORTANT: random crop only works for classification since the
@@ -165,19 +176,96 @@ class ImageGenerator(object):
                                                             box_corners)
         return image_array, box_corners
 
+    def fit_lighting(self, image_array):
+        """PCA lighting basis of a sample of RGB images, computed once and
+        shared by every batch in batch transform mode."""
+        pixels = np.asarray(image_array, dtype='float64').reshape(-1, 3) / 255.0
+        covariance_matrix = np.cov(pixels, rowvar=False)
+        eigen_values, eigen_vectors = np.linalg.eigh(covariance_matrix)
+        self.lighting_eigen_values = eigen_values
+        self.lighting_eigen_vectors = eigen_vectors
+
+    def _random_factors(self, num_images, variance, offset):
+        alpha = 2.0 * np.random.random(num_images) * variance + 1 - offset
+        return alpha.astype('float32')[:, None, None, None]
+
+    def _gray_scale_batch(self, image_array):
+        # matmul takes the BLAS path, ndarray.dot with a vector does not
+        return image_array @ np.array([0.299, 0.587, 0.114], 'float32')
+
+    def saturation_batch(self, image_array):
+        gray_scale = self._gray_scale_batch(image_array)
+        alpha = self._random_factors(len(image_array), self.brightness_var,
+                                     self.saturation_var)
+        image_array *= alpha
+        image_array += (1 - alpha) * gray_scale[..., None]
+        return np.clip(image_array, 0, 255, out=image_array)
+
+    def brightness_batch(self, image_array):
+        image_array *= self._random_factors(len(image_array),
+                                            self.brightness_var,
+                                            self.saturation_var)
+        return np.clip(image_array, 0, 255, out=image_array)
+
+    def contrast_batch(self, image_array):
+        gray_scale = self._gray_scale_batch(image_array).mean(axis=(1, 2))
+        alpha = self._random_factors(len(image_array), self.contrast_var,
+                                     self.contrast_var)
+        image_array *= alpha
+        image_array += (1 - alpha) * gray_scale[:, None, None, None]
+        return np.clip(image_array, 0, 255, out=image_array)
+
+    def lighting_batch(self, image_array):
+        noise = np.random.randn(len(image_array), 3) * self.lighting_std
+        noise = (self.lighting_eigen_values * noise).dot(
+            self.lighting_eigen_vectors.T) * 255
+        image_array += noise.astype('float32')[:, None, None, :]
+        return np.clip(image_array, 0, 255, out=image_array)
+
+    def transform_batch(self, image_array):
+        """In-place `transform` of a float32 (batch, height, width, 3) array
+        without bounding boxes. Every jitter draws its random factors per
+        image; the jitter order is shuffled once per batch and lighting uses
+        the basis from `fit_lighting` (fitted on the first batch if unset)."""
+        if self.lighting_std and self.lighting_eigen_vectors is None:
+            self.fit_lighting(image_array)
+
+        shuffle(self.batch_color_jitter)
+        for jitter in self.batch_color_jitter:
+            jitter(image_array)
+
+        if self.lighting_std:
+            self.lighting_batch(image_array)
+
+        if self.horizontal_flip_probability > 0:
+            flip_mask = (np.random.random(len(image_array)) <
+                         self.horizontal_flip_probability)
+            image_array[flip_mask] = image_array[flip_mask, :, ::-1]
+
+        if self.vertical_flip_probability > 0:
+            flip_mask = (np.random.random(len(image_array)) <
+                         self.vertical_flip_probability)
+            image_array[flip_mask] = image_array[flip_mask, ::-1]
+        return image_array
+
     def preprocess_images(self, image_array):
         return preprocess_input(image_array)
 
+    def _shuffled_keys(self, mode):
+        if mode =='train':
+            shuffle(self.train_keys)
+            return self.train_keys
+        elif mode == 'val' or  mode == 'demo':
+            shuffle(self.validation_keys)
+            return self.validation_keys
+        else:
+            raise Exception('invalid mode: %s' % mode)
+
     def flow(self, mode='train'):
+            if self.batch_transform and self.ground_truth_transformer == None:
+                yield from self._flow_batches(mode)
             while True:
-                if mode =='train':
-                    shuffle(self.train_keys)
-                    keys = self.train_keys
-                elif mode == 'val' or  mode == 'demo':
-                    shuffle(self.validation_keys)
-                    keys = self.validation_keys
-                else:
-                    raise Exception('invalid mode: %s' % mode)
+                keys = self._shuffled_keys(mode)
 
                 inputs = []
                 targets = []
@@ -227,6 +315,157 @@ class ImageGenerator(object):
                         inputs = []
                         targets = []
 
+    def _flow_batches(self, mode):
+        """`flow` for classification with `transform_batch`: images are read
+        straight into a float32 batch array that is augmented as a whole."""
+        width, height = self.image_size
+        while True:
+            keys = self._shuffled_keys(mode)
+
+            inputs = np.empty((self.batch_size, height, width, 3), 'float32')
+            targets = []
+            for key in keys:
+                image_path = self.path_prefix + key
+                image_array = imread(image_path)
+                image_array = imresize(image_array, self.image_size)
+
+                num_image_channels = len(image_array.shape)
+                if num_image_channels != 3:
+                    continue
+
+                if self.do_random_crop:
+                    image_array = self._do_random_crop(image_array)
+
+                inputs[len(targets)] = image_array
+                targets.append(self.ground_truth_data[key])
+                if len(targets) < self.batch_size:
+                    continue
+
+                if mode == 'train' or mode == 'demo':
+                    self.transform_batch(inputs)
+                if self.grayscale:
+                    gray_inputs = np.empty(inputs.shape[:3] + (1,), 'float32')
+                    for image_arg, image_array in enumerate(
+                            inputs.astype('uint8')):
+                        gray_inputs[image_arg, :, :, 0] = cv2.cvtColor(
+                            image_array, cv2.COLOR_RGB2GRAY)
+                    inputs = gray_inputs
+                targets = to_categorical(targets)
+                if mode == 'train' or mode == 'val':
+                    inputs = self.preprocess_images(inputs)
+                yield self._wrap_in_dictionary(inputs, targets)
+                # a new array per batch: the consumer may still hold the last one
+                inputs = np.empty((self.batch_size, height, width, 3), 'float32')
+                targets = []
+
     def _wrap_in_dictionary(self, image_array, targets):
         return [{'input_1':image_array},
                 {'predictions':targets}]
+
+
+def _prefetch_worker(image_generator, mode, keys, seed, batch_queue,
+                     stop_event):
+    if mode == 'train':
+        image_generator.train_keys = keys
+    else:
+        image_generator.validation_keys = keys
+    # flow draws from the global random modules, which are per process here
+    random.seed(seed)
+    np.random.seed(seed)
+    # do not wait for unread batches to be flushed when stopped
+    batch_queue.cancel_join_thread()
+    try:
+        for batch in image_generator.flow(mode):
+            while not stop_event.is_set():
+                try:
+                    batch_queue.put(batch, timeout=0.1)
+                    break
+                except queue.Full:
+                    continue
+            else:
+                return
+    except Exception as e:
+        batch_queue.put(e)
+
+
+class PrefetchingGenerator(object):
+    """Runs `image_generator.flow(mode)` in `num_workers` processes that keep
+    up to `max_prefetch` augmented batches ready ahead of the consumer.
+
+    Every worker flows over its own shard of the keys with the seed
+    `seed + worker_id`, and batches are taken from the workers in turn,
+    so a given seed always yields the same sequence of batches.
+    Iterating yields `flow`'s batches; call `close` (or use it as a
+    context manager) to stop the workers.
+    """
+    def __init__(self, image_generator, mode='train', num_workers=4,
+                 max_prefetch=8, seed=None):
+        if mode not in ('train', 'val', 'demo'):
+            raise Exception('invalid mode: %s' % mode)
+        if seed is None:
+            seed = random.randrange(2 ** 31)
+        self.num_workers = max(1, int(num_workers))
+        self.max_prefetch = max(self.num_workers, int(max_prefetch))
+        self.seed = seed
+        worker_prefetch = -(-self.max_prefetch // self.num_workers)
+        # spawn: the caller may already have TensorFlow loaded
+        context = multiprocessing.get_context('spawn')
+        self._stop_event = context.Event()
+        self._queues, self._workers = [], []
+        if mode == 'train':
+            keys = image_generator.train_keys
+        else:
+            keys = image_generator.validation_keys
+        if len(keys) // self.num_workers < image_generator.batch_size:
+            raise Exception('Not enough %s keys for %d workers: %d per worker' %
+                            (mode, self.num_workers,
+                             len(keys) // self.num_workers))
+        for worker_id in range(self.num_workers):
+            batch_queue = context.Queue(maxsize=worker_prefetch)
+            worker = context.Process(
+                target=_prefetch_worker, name='prefetch-%d' % worker_id,
+                args=(image_generator, mode, keys[worker_id::self.num_workers],
+                      seed + worker_id, batch_queue, self._stop_event))
+            worker.daemon = True
+            worker.start()
+            self._queues.append(batch_queue)
+            self._workers.append(worker)
+        self._next_worker = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        worker_id = self._next_worker
+        self._next_worker = (worker_id + 1) % self.num_workers
+        while True:
+            try:
+                batch = self._queues[worker_id].get(timeout=1.0)
+                break
+            except queue.Empty:
+                if not self._workers[worker_id].is_alive():
+                    self.close()
+                    raise Exception('Prefetching worker %d exited with code %s' %
+                                    (worker_id, self._workers[worker_id].exitcode))
+        if isinstance(batch, Exception):
+            self.close()
+            raise batch
+        return batch
+
+    def flow(self):
+        """Plain generator over the batches, for APIs that require one"""
+        while True:
+            yield next(self)
+
+    def close(self):
+        self._stop_event.set()
+        for worker in self._workers:
+            worker.join(timeout=1.0)
+            if worker.is_alive():
+                worker.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
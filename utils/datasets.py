@@ -2,17 +2,26 @@ from scipy.io import loadmat
 import pandas as pd
 import numpy as np
 from random import shuffle
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
 import os
 import cv2
 
 class DataManager(object):
     """Class for loading fer2013 emotion classification dataset or
         imdb gender classification dataset."""
-    def __init__(self, dataset_name='imdb', dataset_path=None, image_size=(48, 48)):
+    def __init__(self, dataset_name='imdb', dataset_path=None, image_size=(48, 48),
+                 use_cache=True, num_workers=1):
 
         self.dataset_name = dataset_name
         self.dataset_path = dataset_path
         self.image_size = image_size
+        self.use_cache = use_cache
+        # worker processes are opt-in: spawning them needs the calling
+        # script to guard its entry point with `if __name__ == '__main__'`
+        self.num_workers = num_workers or 1
         if self.dataset_path != None:
             self.dataset_path = dataset_path
         elif self.dataset_name == 'imdb':
@@ -26,12 +35,41 @@ class DataManager(object):
 
     def get_data(self):
         if self.dataset_name == 'imdb':
-            ground_truth_data = self._load_imdb()
-        elif self.dataset_name == 'fer2013':
-            ground_truth_data = self._load_fer2013()
-        elif self.dataset_name == 'KDEF':
-            ground_truth_data = self._load_KDEF()
-        return ground_truth_data
+            return self._load_imdb()
+        if self.use_cache:
+            dataset = self.get_mapped_data()
+        else:
+            dataset = MappedDataset(*self._parse_faces(),
+                                    num_classes=len(get_labels(self.dataset_name)))
+        return dataset.get_batch(slice(None))
+
+    def get_mapped_data(self):
+        """fer2013 or KDEF as a `MappedDataset` over uint8 .npy files written
+        next to the dataset on first use; later calls memory-map them."""
+        if self.dataset_name == 'imdb':
+            raise Exception('Invalid dataset for get_mapped_data: %s' %
+                            self.dataset_name)
+        num_classes = len(get_labels(self.dataset_name))
+        faces_path, emotions_path = dataset_cache_paths(self.dataset_path,
+                                                        self.image_size)
+        if not is_cache_fresh(self.dataset_path, [faces_path, emotions_path]):
+            faces, emotion_args = self._parse_faces()
+            try:
+                save_npy(faces_path, faces)
+                save_npy(emotions_path, emotion_args)
+            except OSError as e:
+                print(f"Warning: could not write the {self.dataset_name} "
+                      f"cache: {e}")
+                return MappedDataset(faces, emotion_args, num_classes)
+        return MappedDataset(np.load(faces_path, mmap_mode='r'),
+                             np.load(emotions_path, mmap_mode='r'),
+                             num_classes)
+
+    def _parse_faces(self):
+        """uint8 (N, height, width) faces and uint8 label indices"""
+        if self.dataset_name == 'fer2013':
+            return self._parse_fer2013()
+        return self._parse_KDEF()
 
     def _load_imdb(self):
         face_score_treshold = 3
@@ -53,49 +91,141 @@ class DataManager(object):
             image_names.append(image_name)
         return dict(zip(image_names, gender_classes))
 
-    def _load_fer2013(self):
-        data = pd.read_csv(self.dataset_path)
-        pixels = data['pixels'].tolist()
-        width, height = 48, 48
-        faces = []
-        for pixel_sequence in pixels:
-            face = [int(pixel) for pixel in pixel_sequence.split(' ')]
-            face = np.asarray(face).reshape(width, height)
-            face = cv2.resize(face.astype('uint8'), self.image_size)
-            faces.append(face.astype('float32'))
-        faces = np.asarray(faces)
-        faces = np.expand_dims(faces, -1)
-        emotions = pd.get_dummies(data['emotion']).values
-        return faces, emotions
-
-    def _load_KDEF(self):
+    def _parse_fer2013(self):
+        data = pd.read_csv(self.dataset_path, usecols=['emotion', 'pixels'])
+        faces = parse_pixel_strings(data['pixels'].tolist(), (48, 48))
+        if tuple(self.image_size) != (48, 48):
+            width, height = self.image_size
+            resized_faces = np.empty((len(faces), height, width), dtype='uint8')
+            for face_arg, face in enumerate(faces):
+                cv2.resize(face, self.image_size, dst=resized_faces[face_arg])
+            faces = resized_faces
+        emotion_args = data['emotion'].values.astype('uint8')
+        return faces, emotion_args
+
+    def _parse_KDEF(self):
+        """Files whose name matches none of the classes are dropped, and so
+        are files that cannot be read."""
         class_to_arg = get_class_to_arg(self.dataset_name)
-        num_classes = len(class_to_arg)
 
-        file_paths = []
+        file_paths, emotion_args = [], []
         for folder, subfolders, filenames in os.walk(self.dataset_path):
             for filename in filenames:
-                if filename.lower().endswith(('.jpg')):
+                if not filename.lower().endswith(('.jpg')):
+                    continue
+                # there are two file names in the dataset that don't match the given classes
+                file_emotion = filename[4:6]
+                if file_emotion in class_to_arg:
                     file_paths.append(os.path.join(folder, filename))
+                    emotion_args.append(class_to_arg[file_emotion])
+
+        faces, readable = read_gray_images(file_paths, self.image_size,
+                                           self.num_workers)
+        emotion_args = np.asarray(emotion_args, dtype='uint8')
+        if not readable.all():
+            print(f"Warning: skipped {np.sum(~readable)} unreadable images")
+            faces, emotion_args = faces[readable], emotion_args[readable]
+        return faces, emotion_args
+
+
+# per-process view of the shared output array, set by _init_image_reader
+_image_reader = {}
+
+def _init_image_reader(shared_memory_name, shape):
+    shared_memory = SharedMemory(name=shared_memory_name)
+    _image_reader['shared_memory'] = shared_memory
+    _image_reader['faces'] = np.ndarray(shape, dtype='uint8',
+                                        buffer=shared_memory.buf)
+
+def _read_image_chunk(start, file_paths, image_size):
+    faces = _image_reader['faces'][start:start + len(file_paths)]
+    return _read_images_into(file_paths, image_size, faces)
+
+def _read_images_into(file_paths, image_size, faces):
+    readable = np.ones(len(file_paths), dtype=bool)
+    for file_arg, file_path in enumerate(file_paths):
+        image_array = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
+        if image_array is None:
+            readable[file_arg] = False
+            continue
+        cv2.resize(image_array, image_size, dst=faces[file_arg])
+    return readable
+
+def read_gray_images(file_paths, image_size, num_workers=1, chunk_size=64):
+    """Read and resize images into one uint8 (N, height, width) array.
+
+    With several workers, processes read chunks of files straight into a
+    shared preallocated array; if the pool cannot start (e.g. the caller
+    has no `__main__` guard) the files are read serially instead. Returns
+    the faces and a mask of the files that could be read.
+    """
+    width, height = image_size
+    shape = (len(file_paths), height, width)
+    if num_workers <= 1 or len(file_paths) <= chunk_size:
+        faces = np.empty(shape, dtype='uint8')
+        return faces, _read_images_into(file_paths, image_size, faces)
+
+    shared_memory = SharedMemory(create=True, size=max(1, int(np.prod(shape))))
+    try:
+        # spawn: the caller may already have TensorFlow loaded
+        with ProcessPoolExecutor(max_workers=num_workers,
+                                 mp_context=get_context('spawn'),
+                                 initializer=_init_image_reader,
+                                 initargs=(shared_memory.name, shape)) as pool:
+            futures = [pool.submit(_read_image_chunk, start,
+                                   file_paths[start:start + chunk_size],
+                                   image_size)
+                       for start in range(0, len(file_paths), chunk_size)]
+            readable = np.concatenate([future.result() for future in futures])
+        faces = np.ndarray(shape, dtype='uint8', buffer=shared_memory.buf).copy()
+    except BrokenProcessPool as e:
+        print(f"Warning: image reader processes failed ({e}), reading serially")
+        return read_gray_images(file_paths, image_size, 1)
+    finally:
+        shared_memory.close()
+        shared_memory.unlink()
+    return faces, readable
+
+
+class MappedDataset(object):
+    """Faces kept as uint8 (usually a read-only memory map) with their label
+    indices. Slicing and splitting return views; faces are converted to
+    float32 and labels to one-hot rows only per batch in `get_batch`.
+    """
+    def __init__(self, faces, emotion_args, num_classes):
+        self.faces = faces
+        self.emotion_args = emotion_args
+        self.num_classes = num_classes
+
+    def __len__(self):
+        return len(self.faces)
+
+    @property
+    def image_shape(self):
+        return self.faces.shape[1:] + (1,)
+
+    def __getitem__(self, indices):
+        """Lazy subset: a view for slices, a copy for index arrays"""
+        return MappedDataset(self.faces[indices], self.emotion_args[indices],
+                             self.num_classes)
+
+    def get_batch(self, indices):
+        """float32 (n, height, width, 1) faces and one-hot emotions"""
+        faces = np.expand_dims(self.faces[indices].astype('float32'), -1)
+        return faces, one_hot(self.emotion_args[indices], self.num_classes)
+
+    def iter_batches(self, batch_size, do_shuffle=False):
+        indices = np.arange(len(self))
+        if do_shuffle:
+            np.random.shuffle(indices)
+        for start in range(0, len(indices), batch_size):
+            # sorted reads keep a memory-mapped file access sequential
+            yield self.get_batch(np.sort(indices[start:start + batch_size]))
+
+    def split(self, validation_split=.2):
+        num_train_samples = int((1 - validation_split) * len(self))
+        return self[:num_train_samples], self[num_train_samples:]
 
-        num_faces = len(file_paths)
-        y_size, x_size = self.image_size
-        faces = np.zeros(shape=(num_faces, y_size, x_size))
-        emotions = np.zeros(shape=(num_faces, num_classes))
-        for file_arg, file_path in enumerate(file_paths):
-            image_array = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
-            image_array = cv2.resize(image_array, (y_size, x_size))
-            faces[file_arg] = image_array
-            file_basename = os.path.basename(file_path)
-            file_emotion = file_basename[4:6]
-            # there are two file names in the dataset that don't match the given classes
-            try:
-                emotion_arg = class_to_arg[file_emotion]
-            except:
-                continue
-            emotions[file_arg, emotion_arg] = 1
-        faces = np.expand_dims(faces, -1)
-        return faces, emotions
 
 def get_labels(dataset_name):
     if dataset_name == 'fer2013':
@@ -119,6 +249,49 @@ def get_class_to_arg(dataset_name='fer2013'):
     else:
         raise Exception('Invalid dataset name')
 
+def parse_pixel_strings(pixel_strings, image_shape):
+    """Space-separated pixel strings -> uint8 array of `image_shape` images.
+    Each row is parsed in C straight into a preallocated array."""
+    faces = np.empty((len(pixel_strings),) + tuple(image_shape), dtype='uint8')
+    flat_faces = faces.reshape(len(pixel_strings), -1)
+    for face_arg, pixel_sequence in enumerate(pixel_strings):
+        flat_faces[face_arg] = np.fromstring(pixel_sequence, dtype='uint8',
+                                             sep=' ')
+    return faces
+
+def one_hot(emotion_args, num_classes):
+    return np.eye(num_classes, dtype='uint8')[emotion_args]
+
+def dataset_cache_paths(dataset_path, image_size):
+    """Cache files next to the CSV file or image folder, never inside the
+    folder, so that writing them does not mark the folder as modified"""
+    if os.path.isdir(dataset_path):
+        root = os.path.normpath(dataset_path)
+    else:
+        root = os.path.splitext(dataset_path)[0]
+    return ('%s_faces_%dx%d.npy' % ((root,) + tuple(image_size)),
+            root + '_emotions.npy')
+
+def is_cache_fresh(source_path, cache_paths):
+    if not all(os.path.exists(cache_path) for cache_path in cache_paths):
+        return False
+    if os.path.isdir(source_path):
+        # adding or removing files touches their folder
+        source_mtime = max(os.path.getmtime(folder)
+                           for folder, _, _ in os.walk(source_path))
+    else:
+        source_mtime = os.path.getmtime(source_path)
+    return all(os.path.getmtime(cache_path) >= source_mtime
+               for cache_path in cache_paths)
+
+def save_npy(file_path, array):
+    """Write through a temporary file so an interrupted run never leaves a
+    truncated cache behind."""
+    temporary_path = file_path + '.tmp'
+    with open(temporary_path, 'wb') as npy_file:
+        np.save(npy_file, array)
+    os.replace(temporary_path, file_path)
+
 def split_imdb_data(ground_truth_data, validation_split=.2, do_shuffle=False):
     ground_truth_keys = sorted(ground_truth_data.keys())
     if do_shuffle == True:
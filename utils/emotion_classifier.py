@@ -0,0 +1,210 @@
+import numpy as np
+
+
+class EmotionClassifier(object):
+    """Graph-mode inference wrapper for the Keras emotion model.
+
+    `keras.Model.predict` builds a data adapter and runs callbacks on every
+    call, which dominates the cost of classifying a single face. This
+    wrapper loads the model once and traces its forward pass into a
+    `tf.function` with a fixed `(None, height, width, 1)` float32 signature,
+    so every batch size reuses the same concrete graph.
+    """
+    def __init__(self, model_path):
+        import tensorflow as tf
+        from tensorflow import keras
+
+        self.model_path = str(model_path)
+        # compile=False: the optimizer state is not needed for inference
+        self.model = keras.models.load_model(self.model_path, compile=False)
+        self.input_shape = tuple(self.model.input_shape[1:])
+        self.target_size = self.input_shape[0:2]
+        self.num_classes = self.model.output_shape[-1]
+        self.input_signature = [tf.TensorSpec(shape=(None,) + self.input_shape,
+                                              dtype=tf.float32)]
+        self._forward = tf.function(self._call,
+                                    input_signature=self.input_signature)
+
+    def _call(self, faces):
+        return self.model(faces, training=False)
+
+    def predict(self, faces):
+        """Classify a `(N, height, width, 1)` batch of preprocessed faces
+        and return the `(N, num_classes)` softmax probabilities."""
+        return self._forward(np.asarray(faces, dtype=np.float32)).numpy()
+
+    def warm_up(self, batch_sizes=(1,)):
+        """Trace the graph and run it once per batch size so the first
+        real request does not pay the tracing cost."""
+        for batch_size in batch_sizes:
+            self.predict(np.zeros((batch_size,) + self.input_shape,
+                                  dtype=np.float32))
+        return self
+
+
+class TFLiteEmotionClassifier(EmotionClassifier):
+    """Emotion model converted to TensorFlow Lite. Uses the standalone
+    LiteRT / tflite-runtime interpreter when installed so the full
+    TensorFlow runtime never has to be imported."""
+    def __init__(self, model_path):
+        self.model_path = str(model_path)
+        self.interpreter = _load_tflite_interpreter(self.model_path)
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self.input_shape = tuple(int(dim) for dim in self._input['shape'][1:])
+        self.target_size = self.input_shape[0:2]
+        self.num_classes = int(self._output['shape'][-1])
+        self._batch_size = None
+
+    def predict(self, faces):
+        faces = np.asarray(faces, dtype=np.float32)
+        if faces.shape[0] != self._batch_size:
+            self.interpreter.resize_tensor_input(
+                self._input['index'], (faces.shape[0],) + self.input_shape)
+            self.interpreter.allocate_tensors()
+            self._batch_size = faces.shape[0]
+        self.interpreter.set_tensor(self._input['index'], faces)
+        self.interpreter.invoke()
+        return self.interpreter.get_tensor(self._output['index'])
+
+
+class ONNXEmotionClassifier(EmotionClassifier):
+    """Emotion model converted to ONNX and run with ONNX Runtime on CPU."""
+    def __init__(self, model_path):
+        import onnxruntime
+
+        self.model_path = str(model_path)
+        self.session = onnxruntime.InferenceSession(
+            self.model_path, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self._input_name = model_input.name
+        self.input_shape = tuple(int(dim) for dim in model_input.shape[1:])
+        self.target_size = self.input_shape[0:2]
+        self.num_classes = int(self.session.get_outputs()[0].shape[-1])
+
+    def predict(self, faces):
+        faces = np.asarray(faces, dtype=np.float32)
+        return self.session.run(None, {self._input_name: faces})[0]
+
+
+def _load_tflite_interpreter(model_path):
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+    except ImportError:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+    return Interpreter(model_path=model_path)
+
+
+def load_emotion_classifier(model_path, backend='keras'):
+    if backend == 'keras':
+        return EmotionClassifier(model_path)
+    elif backend in ('tflite', 'tflite_int8'):
+        return TFLiteEmotionClassifier(model_path)
+    elif backend == 'onnx':
+        return ONNXEmotionClassifier(model_path)
+    else:
+        raise Exception('Invalid emotion backend: %s' % backend)
+
+
+def convert_emotion_model(keras_model_path, output_path, backend):
+    """Convert the Keras hdf5 emotion model into the given backend format."""
+    import tensorflow as tf
+
+    classifier = EmotionClassifier(keras_model_path)
+    if backend == 'tflite':
+        converter = tf.lite.TFLiteConverter.from_keras_model(classifier.model)
+        with open(output_path, 'wb') as model_file:
+            model_file.write(converter.convert())
+    elif backend == 'onnx':
+        import tf2onnx
+
+        input_signature = [tf.TensorSpec(shape=(None,) + classifier.input_shape,
+                                         dtype=tf.float32, name='faces')]
+
+        @tf.function
+        def forward(faces):
+            return classifier.model(faces, training=False)
+
+        tf2onnx.convert.from_function(forward, input_signature=input_signature,
+                                      opset=13, output_path=str(output_path))
+    else:
+        raise Exception('Invalid conversion backend: %s' % backend)
+    return output_path
+
+
+def quantize_emotion_model(keras_model_path, output_path, calibration_faces):
+    """Post-training int8 quantization of the Keras emotion model.
+
+    Weights and activations are quantized to int8 using the ranges observed
+    on `calibration_faces` (preprocessed, `(N, height, width, 1)`); the
+    model keeps float32 inputs and outputs so it is a drop-in replacement
+    for the float TFLite model.
+    """
+    import tensorflow as tf
+
+    classifier = EmotionClassifier(keras_model_path)
+    calibration_faces = np.asarray(calibration_faces, dtype=np.float32)
+
+    def representative_dataset():
+        for face in calibration_faces:
+            yield [face[np.newaxis]]
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(classifier.model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    converter.representative_dataset = representative_dataset
+    converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+    with open(output_path, 'wb') as model_file:
+        model_file.write(converter.convert())
+    return output_path
+
+
+def model_sha256(model_path):
+    import hashlib
+
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as model_file:
+        for chunk in iter(lambda: model_file.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def check_quantization_report(report_path, min_agreement, model_path):
+    """Refuse a quantized model whose recorded top-1 agreement with the
+    float model is missing or below `min_agreement`, or whose report was
+    written for a different model file than `model_path`."""
+    import json
+
+    try:
+        with open(report_path) as report_file:
+            report = json.load(report_file)
+    except (IOError, ValueError):
+        raise Exception('Quantization report not found or unreadable: %s '
+                        '(run python quantize_model.py)' % report_path)
+    try:
+        sha256 = model_sha256(model_path)
+    except IOError:
+        raise Exception('Quantized model not found: %s' % model_path)
+    if report.get('model_sha256') != sha256:
+        raise Exception('Quantization report %s does not describe %s '
+                        '(re-run python quantize_model.py)' %
+                        (report_path, model_path))
+    agreement = report.get('top1_agreement', 0.0)
+    if agreement < min_agreement:
+        raise Exception('Quantized model agreement %.2f%% is below the '
+                        'required %.2f%%' % (100 * agreement, 100 * min_agreement))
+    return report
+
+
+def compare_classifiers(reference, candidate, faces):
+    """Return top-1 agreement and max absolute probability difference
+    between two classifiers on the same batch of preprocessed faces."""
+    reference_predictions = reference.predict(faces)
+    candidate_predictions = candidate.predict(faces)
+    agreement = np.mean(np.argmax(reference_predictions, axis=1) ==
+                        np.argmax(candidate_predictions, axis=1))
+    max_error = np.abs(reference_predictions - candidate_predictions).max()
+    return float(agreement), float(max_error)
@@ -0,0 +1,108 @@
+import threading
+
+import cv2
+import numpy as np
+
+FACE_DETECTORS = ('haar', 'lbp', 'dnn')
+
+
+class CascadeFaceDetector(object):
+    """Haar or LBP cascade face detector.
+
+    Calling the detector with a grayscale image returns an `(N, 4)` array
+    of `(x, y, w, h)` boxes, the format consumed by `apply_offsets`;
+    `min_size` / `max_size` restrict the scales scanned for this call.
+    OpenCV cascades are not thread-safe, so every calling thread gets its
+    own copy of the model.
+    """
+    def __init__(self, model_path, scale_factor=1.1, min_neighbors=5,
+                 min_size=(30, 30)):
+        self.model_path = str(model_path)
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        self._local = threading.local()
+        self.model  # load now so a bad model path fails early
+
+    @property
+    def model(self):
+        model = getattr(self._local, 'model', None)
+        if model is None:
+            model = cv2.CascadeClassifier(self.model_path)
+            if model.empty():
+                raise Exception('Could not load face cascade: %s' %
+                                self.model_path)
+            self._local.model = model
+        return model
+
+    def __call__(self, gray_image, min_size=None, max_size=None):
+        return self.model.detectMultiScale(
+            gray_image,
+            scaleFactor=self.scale_factor,
+            minNeighbors=self.min_neighbors,
+            minSize=min_size or self.min_size,
+            maxSize=max_size or (0, 0),
+            flags=cv2.CASCADE_SCALE_IMAGE)
+
+
+class DNNFaceDetector(object):
+    """OpenCV DNN face detector (res10 300x300 SSD, Caffe weights) with the
+    same call signature and `(x, y, w, h)` output as the cascades. Like the
+    cascades, the network is loaded once per calling thread."""
+    input_size = (300, 300)
+    mean = (104.0, 177.0, 123.0)
+
+    def __init__(self, prototxt_path, model_path, confidence_threshold=0.5,
+                 min_size=(30, 30)):
+        self.prototxt_path = str(prototxt_path)
+        self.model_path = str(model_path)
+        self.confidence_threshold = confidence_threshold
+        self.min_size = min_size
+        self._local = threading.local()
+        self.model  # load now so a bad model path fails early
+
+    @property
+    def model(self):
+        model = getattr(self._local, 'model', None)
+        if model is None:
+            model = cv2.dnn.readNetFromCaffe(self.prototxt_path,
+                                             self.model_path)
+            self._local.model = model
+        return model
+
+    def __call__(self, gray_image, min_size=None, max_size=None):
+        image_height, image_width = gray_image.shape[:2]
+        bgr_image = cv2.cvtColor(gray_image, cv2.COLOR_GRAY2BGR)
+        blob = cv2.dnn.blobFromImage(cv2.resize(bgr_image, self.input_size),
+                                     1.0, self.input_size, self.mean)
+        model = self.model
+        model.setInput(blob)
+        detections = model.forward()[0, 0]
+
+        detections = detections[detections[:, 2] >= self.confidence_threshold]
+        corners = detections[:, 3:7] * (image_width, image_height,
+                                        image_width, image_height)
+        corners = np.clip(corners, 0, (image_width, image_height,
+                                       image_width, image_height))
+        faces = np.round(np.hstack([corners[:, :2],
+                                    corners[:, 2:] - corners[:, :2]]))
+        faces = faces.astype(np.int32)
+
+        min_width, min_height = min_size or self.min_size
+        keep = (faces[:, 2] >= min_width) & (faces[:, 3] >= min_height)
+        if max_size:
+            keep &= (faces[:, 2] <= max_size[0]) & (faces[:, 3] <= max_size[1])
+        return faces[keep]
+
+
+def load_face_detector(detector_name, model_path, prototxt_path=None,
+                       scale_factor=1.1, min_neighbors=5, min_size=(30, 30),
+                       confidence_threshold=0.5):
+    if detector_name in ('haar', 'lbp'):
+        return CascadeFaceDetector(model_path, scale_factor, min_neighbors,
+                                   min_size)
+    elif detector_name == 'dnn':
+        return DNNFaceDetector(prototxt_path, model_path, confidence_threshold,
+                               min_size)
+    else:
+        raise Exception('Invalid face detector: %s' % detector_name)
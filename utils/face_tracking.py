@@ -0,0 +1,173 @@
+from collections import deque
+
+import numpy as np
+
+
+class FaceTracker(object):
+    """Per-session face tracker that avoids full-frame detection on most
+    frames.
+
+    After a full-frame detection the last face box is reused: the next
+    frames only search a region of interest around it, restricted to face
+    sizes close to the tracked one. A full-frame detection runs again every
+    `redetect_interval` frames, when the face is lost inside the search
+    region, or when the frame geometry changes.
+
+    `detect_faces(gray_image, min_size=None, max_size=None)` must return
+    `(x, y, w, h)` boxes in the coordinates of the image it is given.
+    """
+    def __init__(self, detect_faces, redetect_interval=10, search_margin=0.5,
+                 size_tolerance=0.3):
+        self.detect_faces = detect_faces
+        self.redetect_interval = redetect_interval
+        self.search_margin = search_margin
+        self.size_tolerance = size_tolerance
+        self.face_box = None
+        self.frame_shape = None
+        self.frames_since_detection = 0
+        self.full_detections = 0
+        self.tracked_detections = 0
+
+    def reset(self):
+        self.face_box = None
+        self.frames_since_detection = 0
+
+    def __call__(self, gray_image):
+        return self.update(gray_image)
+
+    def update(self, gray_image):
+        """Return the face boxes for this frame, tracked face first."""
+        if gray_image.shape != self.frame_shape:
+            self.frame_shape = gray_image.shape
+            self.reset()
+
+        if (self.face_box is not None and
+                self.frames_since_detection < self.redetect_interval):
+            face_box = self._search_region(gray_image)
+            if face_box is not None:
+                self.face_box = face_box
+                self.frames_since_detection += 1
+                self.tracked_detections += 1
+                return np.array([face_box])
+
+        faces = self.detect_faces(gray_image)
+        self.full_detections += 1
+        self.frames_since_detection = 0
+        if len(faces) == 0:
+            self.face_box = None
+            return faces
+
+        faces = self._closest_first(np.asarray(faces))
+        self.face_box = tuple(int(value) for value in faces[0])
+        return faces
+
+    def _search_region(self, gray_image):
+        x, y, width, height = self.face_box
+        image_height, image_width = gray_image.shape[:2]
+        x_margin = int(width * self.search_margin)
+        y_margin = int(height * self.search_margin)
+        x1, y1 = max(x - x_margin, 0), max(y - y_margin, 0)
+        x2 = min(x + width + x_margin, image_width)
+        y2 = min(y + height + y_margin, image_height)
+
+        side = min(width, height)
+        min_side = int(side * (1 - self.size_tolerance))
+        max_side = int(max(width, height) * (1 + self.size_tolerance))
+        faces = self.detect_faces(gray_image[y1:y2, x1:x2],
+                                  (min_side, min_side), (max_side, max_side))
+        if len(faces) == 0:
+            return None
+        face_x, face_y, face_width, face_height = max(
+            faces, key=lambda face: face[2] * face[3])
+        return (int(face_x + x1), int(face_y + y1),
+                int(face_width), int(face_height))
+
+    def _closest_first(self, faces):
+        if self.face_box is None or len(faces) == 1:
+            return faces
+        x, y, width, height = self.face_box
+        centers = faces[:, :2] + faces[:, 2:4] / 2.0
+        distances = np.sum((centers - (x + width / 2.0, y + height / 2.0)) ** 2,
+                           axis=1)
+        return faces[np.argsort(distances)]
+
+
+class AdaptiveFaceDetector(object):
+    """Face detection with per-session learned search parameters.
+
+    The first `warmup_detections` full-frame detections are unrestricted.
+    From then on the detector scans only the region where faces have been
+    seen (padded by `region_margin` of the largest face) and only the scales
+    between the smallest and largest observed face (widened by
+    `size_margin`), which skips most of the cascade's image pyramid. If the
+    restricted search finds nothing it falls back to an unrestricted scan.
+
+    Wraps and exposes the same `detect_faces(gray_image, min_size=None,
+    max_size=None)` signature; calls with explicit sizes pass straight
+    through, so it composes with `FaceTracker`.
+    """
+    def __init__(self, detect_faces, warmup_detections=5, history_size=20,
+                 size_margin=0.3, region_margin=0.5):
+        self.detect_faces = detect_faces
+        self.warmup_detections = warmup_detections
+        self.size_margin = size_margin
+        self.region_margin = region_margin
+        self.face_history = deque(maxlen=max(history_size, warmup_detections))
+        self.frame_shape = None
+        self.region = None
+        self.min_size = None
+        self.max_size = None
+        self.restricted_detections = 0
+        self.unrestricted_detections = 0
+
+    def reset(self):
+        self.face_history.clear()
+        self.region = None
+        self.min_size = None
+        self.max_size = None
+
+    def __call__(self, gray_image, min_size=None, max_size=None):
+        if min_size is not None or max_size is not None:
+            return self.detect_faces(gray_image, min_size, max_size)
+
+        if gray_image.shape != self.frame_shape:
+            self.frame_shape = gray_image.shape
+            self.reset()
+
+        if self.region is not None:
+            x1, y1, x2, y2 = self.region
+            faces = self.detect_faces(gray_image[y1:y2, x1:x2],
+                                      self.min_size, self.max_size)
+            self.restricted_detections += 1
+            if len(faces) > 0:
+                faces = np.asarray(faces) + (x1, y1, 0, 0)
+                self._learn(faces)
+                return faces
+
+        faces = self.detect_faces(gray_image)
+        self.unrestricted_detections += 1
+        if len(faces) > 0:
+            self._learn(np.asarray(faces))
+        return faces
+
+    def _learn(self, faces):
+        largest_face = max(faces, key=lambda face: face[2] * face[3])
+        self.face_history.append(tuple(int(value) for value in largest_face))
+        if len(self.face_history) < self.warmup_detections:
+            return
+
+        boxes = np.array(self.face_history)
+        sides = boxes[:, 2:4]
+        min_side = max(int(sides.min() * (1 - self.size_margin)), 1)
+        max_side = int(sides.max() * (1 + self.size_margin))
+        self.min_size = (min_side, min_side)
+        self.max_size = (max_side, max_side)
+
+        image_height, image_width = self.frame_shape[:2]
+        padding = int(max_side * self.region_margin)
+        self.region = (max(int(boxes[:, 0].min()) - padding, 0),
+                       max(int(boxes[:, 1].min()) - padding, 0),
+                       min(int((boxes[:, 0] + boxes[:, 2]).max()) + padding,
+                           image_width),
+                       min(int((boxes[:, 1] + boxes[:, 3]).max()) + padding,
+                           image_height))
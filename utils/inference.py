@@ -1,7 +1,10 @@
+import base64
 import cv2
 import matplotlib.pyplot as plt
 import numpy as np
 from PIL import Image
+from .face_detection import load_face_detector
+from .preprocessor import preprocess_input_into
 
 def load_image(image_path, grayscale=False, target_size=None):
     """Load image using PIL instead of deprecated keras.preprocessing.image"""
@@ -15,12 +18,24 @@ def load_image(image_path, grayscale=False, target_size=None):
     
     return np.array(pil_image)
 
-def load_detection_model(model_path):
-    detection_model = cv2.CascadeClassifier(model_path)
+def decode_frame(frame_data):
+    """Decode a JPEG frame straight into a single grayscale buffer.
+
+    Accepts raw JPEG bytes (Socket.IO binary attachment) or, for older
+    clients, a base64 `data:image/jpeg;base64,...` URL.
+    """
+    if isinstance(frame_data, str):
+        frame_data = base64.b64decode(frame_data.split(',', 1)[-1])
+    image_buffer = np.frombuffer(frame_data, dtype=np.uint8)
+    return cv2.imdecode(image_buffer, cv2.IMREAD_GRAYSCALE)
+
+def load_detection_model(model_path, detector_name='haar', prototxt_path=None):
+    detection_model = load_face_detector(detector_name, model_path,
+                                         prototxt_path, scale_factor=1.3)
     return detection_model
 
 def detect_faces(detection_model, gray_image_array):
-    return detection_model.detectMultiScale(gray_image_array, 1.3, 5)
+    return detection_model(gray_image_array)
 
 def draw_bounding_box(face_coordinates, image_array, color):
     x, y, w, h = face_coordinates
@@ -31,6 +46,53 @@ def apply_offsets(face_coordinates, offsets):
     x_off, y_off = offsets
     return (x - x_off, x + width + x_off, y - y_off, y + height + y_off)
 
+class FaceBatchBuilder(object):
+    """Crops every detected face of a frame into one classifier batch.
+
+    Each box is widened by `offsets`, clipped to the image, resized to
+    `target_size`, a `(height, width)` pair like
+    `EmotionClassifier.target_size`, and normalized by
+    `preprocess_input_into`, writing straight into a preallocated
+    `(N, height, width, 1)` float32 buffer that is reused across frames and
+    grown when a frame has more faces than it holds. The returned batch is a view of that buffer, so it
+    is only valid until the next call.
+    """
+    def __init__(self, target_size, offsets=(20, 40), max_faces=8):
+        self.face_shape = tuple(target_size)
+        self.offsets = offsets
+        height, width = self.face_shape
+        self._resized = np.empty((height, width), dtype=np.uint8)
+        self._batch = np.empty((max_faces, height, width, 1), dtype=np.float32)
+
+    def __call__(self, gray_image, faces):
+        num_faces = len(faces)
+        if num_faces > len(self._batch):
+            self._batch = np.empty((num_faces,) + self._batch.shape[1:],
+                                   dtype=np.float32)
+        batch = self._batch[:num_faces]
+        for face_arg, face_coordinates in enumerate(faces):
+            x1, x2, y1, y2 = apply_offsets(face_coordinates, self.offsets)
+            gray_face = gray_image[max(y1, 0):y2, max(x1, 0):x2]
+            preprocess_input_into(gray_face, batch[face_arg], True,
+                                  self._resized)
+        return batch
+
+def classify_faces(emotion_classifier, face_batch_builder, gray_image, faces,
+                   emotion_labels):
+    """Classify every face of a frame in a single forward pass.
+
+    Returns the per-face emotion labels and the `(N, num_classes)`
+    probabilities, in the order of `faces`.
+    """
+    if len(faces) == 0:
+        return [], np.zeros((0, len(emotion_labels)), dtype=np.float32)
+    emotion_predictions = emotion_classifier.predict(
+        face_batch_builder(gray_image, faces))
+    emotion_label_args = np.argmax(emotion_predictions, axis=1)
+    return ([emotion_labels[emotion_label_arg]
+             for emotion_label_arg in emotion_label_args],
+            emotion_predictions)
+
 def draw_text(coordinates, image_array, text, color, x_offset=0, y_offset=0,
                                                 font_scale=2, thickness=2):
     x, y = coordinates[:2]
@@ -11,6 +11,25 @@ def preprocess_input(x, v2=True):
         x = x * 2.0
     return x
 
+def preprocess_input_into(image, out, v2=True, resized=None):
+    """Resize a uint8 image and normalize it like `preprocess_input`,
+    writing the result straight into `out`.
+
+    `out` is a float32 `(height, width)` or `(height, width, 1)` array, e.g.
+    one slot of a reusable `(batch, height, width, 1)` buffer; the image is
+    resized to its size. `resized` is an optional uint8 `(height, width)`
+    scratch buffer for the resize. Normalization is a single
+    `x * alpha + beta` pass, so no float temporaries are created.
+    """
+    height, width = out.shape[:2]
+    if image.shape[:2] != (height, width):
+        image = cv2.resize(image, (width, height), dst=resized)
+    alpha, beta = (2.0 / 255.0, -1.0) if v2 else (1.0 / 255.0, 0.0)
+    channel = out[..., 0] if out.ndim == 3 else out
+    cv2.addWeighted(image, alpha, image, 0.0, beta, dst=channel,
+                    dtype=cv2.CV_32F)
+    return out
+
 def _imread(image_name):
     """Load image using PIL instead of deprecated scipy.misc.imread"""
     return np.array(Image.open(image_name))
@@ -0,0 +1,104 @@
+from collections import deque
+
+import numpy as np
+
+SMOOTHING_MODES = ('mode', 'mean', 'ema')
+
+
+class EmotionSmoother(object):
+    """Temporal smoothing of per-frame emotion predictions.
+
+    Keeps the last `window_size` predictions in a ring buffer together with
+    running label counts, the update numbers of each label's entries and
+    probability sums, so each `update` costs O(num_classes) regardless of
+    the window size:
+
+    - 'mode': most frequent label in the window, ties going to the label
+      that occurs first (oldest) in the window, like `statistics.mode` in
+      the original list loop
+    - 'mean': arg max of the mean probability vector over the window
+    - 'ema': arg max of an exponential moving average with `ema_alpha`
+    """
+    def __init__(self, num_classes, window_size=10, smoothing='mode',
+                 ema_alpha=0.3):
+        if smoothing not in SMOOTHING_MODES:
+            raise Exception('Invalid smoothing mode: %s' % smoothing)
+        self.num_classes = num_classes
+        self.window_size = max(1, int(window_size))
+        self.smoothing = smoothing
+        self.ema_alpha = ema_alpha
+        self.reset()
+
+    def reset(self):
+        self._labels = [0] * self.window_size
+        self._label_counts = [0] * self.num_classes
+        self._label_updates = [deque() for _ in range(self.num_classes)]
+        self._num_updates = 0
+        self._probabilities = np.zeros((self.window_size, self.num_classes))
+        self._probability_sum = np.zeros(self.num_classes)
+        self._ema = None
+        self._position = 0
+        self.size = 0
+
+    @property
+    def probabilities(self):
+        """Smoothed distribution over the classes"""
+        if self.size == 0:
+            return np.zeros(self.num_classes)
+        if self.smoothing == 'mode':
+            return np.array(self._label_counts, dtype=np.float64) / self.size
+        if self.smoothing == 'mean':
+            return self._probability_sum / self.size
+        return self._ema
+
+    def update(self, emotion_prediction):
+        """Add one prediction (a probability vector or a label index) and
+        return the smoothed label index."""
+        if np.ndim(emotion_prediction) == 0:
+            label = int(emotion_prediction)
+            probabilities = None
+        else:
+            probabilities = np.asarray(emotion_prediction).reshape(-1)
+            label = int(probabilities.argmax())
+        if probabilities is None and self.smoothing != 'mode':
+            probabilities = np.zeros(self.num_classes)
+            probabilities[label] = 1.0
+
+        position = self._position
+        window_full = self.size == self.window_size
+        if window_full:
+            # the evicted entry is the oldest one of its label
+            evicted_label = self._labels[position]
+            self._label_counts[evicted_label] -= 1
+            self._label_updates[evicted_label].popleft()
+        else:
+            self.size += 1
+        self._labels[position] = label
+        self._label_counts[label] += 1
+        self._label_updates[label].append(self._num_updates)
+        self._num_updates += 1
+        self._position = (position + 1) % self.window_size
+
+        if self.smoothing == 'mode':
+            label_counts = self._label_counts
+            max_count = max(label_counts)
+            if label_counts.count(max_count) == 1:
+                return label_counts.index(max_count)
+            # tie: the label whose oldest entry in the window comes first
+            tied_labels = [tied_label for tied_label, count
+                           in enumerate(label_counts) if count == max_count]
+            return min(tied_labels,
+                       key=lambda tied_label: self._label_updates[tied_label][0])
+
+        if self.smoothing == 'mean':
+            if window_full:
+                self._probability_sum -= self._probabilities[position]
+            self._probabilities[position] = probabilities
+            self._probability_sum += probabilities
+            return int(self._probability_sum.argmax())
+
+        if self._ema is None:
+            self._ema = np.array(probabilities, dtype=np.float64)
+        else:
+            self._ema += self.ema_alpha * (probabilities - self._ema)
+        return int(self._ema.argmax())
@@ -0,0 +1,195 @@
+import numpy as np
+
+
+class EmotionTimeline(object):
+    """Emotion samples of one session stored in growable typed arrays.
+
+    Each sample costs a uint8 label index, a float64 timestamp and a uint16
+    question index, plus `num_classes` float16 probabilities when
+    `store_probabilities` is set. Capacity doubles when full; the accessors
+    return views of the filled part, so callers must not keep them across
+    appends.
+
+    Running aggregates for `threshold` (per-question counts, probability and
+    entropy sums, first/last timestamp) are updated on every append, so
+    `summary()` is O(1); `summarize(threshold)` recomputes the same
+    statistics from the arrays for any other threshold.
+    """
+    __slots__ = ('num_classes', 'threshold', 'size', '_labels', '_timestamps',
+                 '_question_indices', '_probabilities', '_question_counts',
+                 '_num_questions', '_probability_sum', '_entropy_sum',
+                 '_first_timestamp', '_last_timestamp')
+
+    def __init__(self, num_classes, initial_capacity=256,
+                 store_probabilities=False, threshold=0.0):
+        self.num_classes = num_classes
+        self.threshold = threshold
+        self.size = 0
+        capacity = max(1, int(initial_capacity))
+        self._labels = np.empty(capacity, dtype=np.uint8)
+        self._timestamps = np.empty(capacity, dtype=np.float64)
+        self._question_indices = np.empty(capacity, dtype=np.uint16)
+        self._probabilities = None
+        if store_probabilities:
+            self._probabilities = np.empty((capacity, num_classes),
+                                           dtype=np.float16)
+
+        self._question_counts = np.zeros((1, num_classes), dtype=np.int64)
+        self._num_questions = 0
+        self._probability_sum = np.zeros(num_classes, dtype=np.float64)
+        self._entropy_sum = 0.0
+        self._first_timestamp = None
+        self._last_timestamp = None
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return len(self._labels)
+
+    @property
+    def nbytes(self):
+        arrays = [self._labels, self._timestamps, self._question_indices]
+        if self._probabilities is not None:
+            arrays.append(self._probabilities)
+        return sum(array.nbytes for array in arrays)
+
+    @property
+    def labels(self):
+        return self._labels[:self.size]
+
+    @property
+    def timestamps(self):
+        return self._timestamps[:self.size]
+
+    @property
+    def question_indices(self):
+        return self._question_indices[:self.size]
+
+    @property
+    def probabilities(self):
+        if self._probabilities is None:
+            return None
+        return self._probabilities[:self.size]
+
+    def summary(self):
+        """Running statistics for `self.threshold`, same keys as `summarize`"""
+        question_counts = self._question_counts[:self._num_questions].copy()
+        mean_probabilities = np.zeros(self.num_classes, dtype=np.float32)
+        mean_entropy = 0.0
+        if self.size > 0:
+            mean_probabilities = (self._probability_sum /
+                                  self.size).astype(np.float32)
+            mean_entropy = self._entropy_sum / self.size
+        return {
+            'counts': question_counts.sum(axis=0),
+            'question_counts': question_counts,
+            'mean_probabilities': mean_probabilities,
+            'mean_entropy': mean_entropy,
+            'duration': self._duration()
+        }
+
+    def summarize(self, threshold=0.0):
+        """Statistics over the stored probability vectors.
+
+        Returns a dict with the per-class `counts` of samples whose top
+        probability is at least `threshold`, the same counts per question
+        (`question_counts`, one row per question index), the mean
+        probability of each class, the mean per-sample entropy in nats and
+        the time between the first and last sample.
+        """
+        if self._probabilities is None:
+            raise Exception('Timeline was created without probabilities')
+        # appends may run on another thread: read the size once, before the
+        # question count, so every array and the count cover the same samples
+        size = self.size
+        num_questions = self._num_questions
+        probabilities = self._probabilities[:size].astype(np.float32)
+        if len(probabilities) == 0:
+            return {
+                'counts': np.zeros(self.num_classes, dtype=np.int64),
+                'question_counts': np.zeros((num_questions, self.num_classes),
+                                            dtype=np.int64),
+                'mean_probabilities': np.zeros(self.num_classes,
+                                               dtype=np.float32),
+                'mean_entropy': 0.0,
+                'duration': 0.0
+            }
+
+        confident = probabilities.max(axis=1) >= threshold
+        labels = self._labels[:size][confident].astype(np.int64)
+        question_indices = self._question_indices[:size][confident].astype(
+            np.int64)
+        question_counts = np.bincount(
+            question_indices * self.num_classes + labels,
+            minlength=num_questions * self.num_classes)
+        question_counts = question_counts.reshape(-1, self.num_classes)
+
+        safe_probabilities = np.where(probabilities > 0, probabilities, 1.0)
+        entropy = -np.sum(probabilities * np.log(safe_probabilities), axis=1)
+        return {
+            'counts': question_counts.sum(axis=0),
+            'question_counts': question_counts,
+            'mean_probabilities': probabilities.mean(axis=0),
+            'mean_entropy': float(entropy.mean()),
+            'duration': self._duration()
+        }
+
+    def append(self, label_index, timestamp, question_index,
+               probabilities=None):
+        if self.size == self.capacity:
+            self._grow(2 * self.capacity)
+        index = self.size
+        self._labels[index] = label_index
+        self._timestamps[index] = timestamp
+        self._question_indices[index] = question_index
+        if self._probabilities is not None:
+            self._probabilities[index] = (np.nan if probabilities is None
+                                          else probabilities)
+        self._update_aggregates(label_index, timestamp, question_index,
+                                probabilities)
+        self.size = index + 1
+
+    def _update_aggregates(self, label_index, timestamp, question_index,
+                           probabilities):
+        if question_index >= len(self._question_counts):
+            question_counts = np.zeros(
+                (max(question_index + 1, 2 * len(self._question_counts)),
+                 self.num_classes), dtype=np.int64)
+            question_counts[:len(self._question_counts)] = \
+                self._question_counts
+            self._question_counts = question_counts
+        self._num_questions = max(self._num_questions, question_index + 1)
+
+        if probabilities is None:
+            self._question_counts[question_index, label_index] += 1
+        else:
+            probabilities = np.asarray(probabilities, dtype=np.float64)
+            if probabilities.max() >= self.threshold:
+                self._question_counts[question_index, label_index] += 1
+            self._probability_sum += probabilities
+            nonzero = probabilities[probabilities > 0]
+            self._entropy_sum -= float(np.sum(nonzero * np.log(nonzero)))
+
+        if self._first_timestamp is None:
+            self._first_timestamp = timestamp
+        self._last_timestamp = timestamp
+
+    def _duration(self):
+        if self._first_timestamp is None:
+            return 0.0
+        return float(self._last_timestamp - self._first_timestamp)
+
+    def _grow(self, capacity):
+        self._labels = self._resized(self._labels, capacity)
+        self._timestamps = self._resized(self._timestamps, capacity)
+        self._question_indices = self._resized(self._question_indices,
+                                               capacity)
+        if self._probabilities is not None:
+            self._probabilities = self._resized(self._probabilities, capacity)
+
+    def _resized(self, array, capacity):
+        resized = np.empty((capacity,) + array.shape[1:], dtype=array.dtype)
+        resized[:self.size] = array[:self.size]
+        return resized
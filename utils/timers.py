@@ -0,0 +1,76 @@
+import heapq
+import itertools
+import threading
+import time
+
+
+class TimerScheduler(object):
+    """Single scheduler owning many keyed deadlines.
+
+    Deadlines live in a heap and are fired by one loop (`run`) instead of a
+    sleeping thread per timer. Scheduling a key that already has a timer
+    replaces it, and cancelled timers are discarded lazily when they reach
+    the top of the heap. `sleep` is the function the loop waits with, e.g.
+    `socketio.sleep` so callbacks run on the Socket.IO event loop.
+    """
+    def __init__(self, sleep=time.sleep, tick=0.5):
+        self.sleep = sleep
+        self.tick = tick
+        self._heap = []
+        self._timers = {}
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+        self.fired = 0
+        self.cancelled = 0
+
+    def schedule(self, key, delay, callback):
+        """Call `callback()` after `delay` seconds unless `key` is cancelled"""
+        entry = [time.monotonic() + delay, next(self._counter), key, callback]
+        with self._lock:
+            previous = self._timers.pop(key, None)
+            if previous is not None:
+                previous[-1] = None
+                self.cancelled += 1
+            self._timers[key] = entry
+            heapq.heappush(self._heap, entry)
+
+    def cancel(self, key):
+        """Cancel the timer for `key`; returns whether one was pending"""
+        with self._lock:
+            entry = self._timers.pop(key, None)
+            if entry is None:
+                return False
+            entry[-1] = None
+            self.cancelled += 1
+            return True
+
+    def pending(self):
+        return len(self._timers)
+
+    def run(self):
+        while True:
+            for callback in self._pop_due():
+                try:
+                    callback()
+                except Exception as e:
+                    print(f"Error in timer callback: {e}")
+            self.sleep(self._time_to_next())
+
+    def _pop_due(self):
+        due = []
+        now = time.monotonic()
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                deadline, _, key, callback = heapq.heappop(self._heap)
+                if callback is None:
+                    continue
+                del self._timers[key]
+                due.append(callback)
+        self.fired += len(due)
+        return due
+
+    def _time_to_next(self):
+        with self._lock:
+            if not self._heap:
+                return self.tick
+            return min(max(self._heap[0][0] - time.monotonic(), 0), self.tick)
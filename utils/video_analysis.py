@@ -0,0 +1,261 @@
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+from .datasets import get_labels
+from .emotion_classifier import load_emotion_classifier
+from .face_detection import load_face_detector
+from .inference import FaceBatchBuilder, apply_offsets, classify_faces
+from .preprocessor import preprocess_input_into
+
+# per-process models, loaded once by init_video_worker
+_worker = {}
+
+
+def init_video_worker(emotion_model_path, emotion_backend, detector_name,
+                      detector_model_path, prototxt_path, detection_params,
+                      emotion_offsets, labels_dataset='fer2013'):
+    """Process-pool initializer: load the face detector and the emotion
+    classifier once per worker, single-threaded so that N workers use N
+    cores instead of oversubscribing them."""
+    cv2.setNumThreads(1)
+    if emotion_backend == 'keras':
+        import tensorflow as tf
+        tf.config.threading.set_intra_op_parallelism_threads(1)
+        tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    emotion_classifier = load_emotion_classifier(emotion_model_path,
+                                                 emotion_backend)
+    _worker['face_detection'] = load_face_detector(
+        detector_name, detector_model_path, prototxt_path, **detection_params)
+    _worker['emotion_classifier'] = emotion_classifier
+    _worker['face_batch_builder'] = FaceBatchBuilder(
+        emotion_classifier.target_size, emotion_offsets)
+    _worker['emotion_offsets'] = emotion_offsets
+    _worker['emotion_labels'] = get_labels(labels_dataset)
+
+
+def count_video_frames(video_path):
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise Exception('Could not open video: %s' % video_path)
+    num_frames = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = capture.get(cv2.CAP_PROP_FPS) or 0.0
+    capture.release()
+    return num_frames, fps
+
+
+def split_frame_ranges(num_frames, chunk_frames):
+    return [(start, min(start + chunk_frames, num_frames))
+            for start in range(0, num_frames, chunk_frames)]
+
+
+def analyze_frame_range(video_path, start_frame, end_frame, frame_stride=1):
+    """Detect and classify the faces of every `frame_stride`-th frame in
+    `[start_frame, end_frame)`. Sampled frames are the ones whose index is
+    a multiple of the stride, so chunk boundaries do not shift them.
+
+    Returns `(frame_indices, boxes, probabilities, frames_analyzed)` with
+    one row per detected face.
+    """
+    face_detection = _worker['face_detection']
+    emotion_classifier = _worker['emotion_classifier']
+    face_batch_builder = _worker['face_batch_builder']
+    emotion_labels = _worker['emotion_labels']
+
+    capture = cv2.VideoCapture(video_path)
+    capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    frame_indices, boxes, probabilities = [], [], []
+    frames_analyzed = 0
+    for frame_index in range(start_frame, end_frame):
+        if frame_index % frame_stride:
+            if not capture.grab():
+                break
+            continue
+        ret, bgr_image = capture.read()
+        if not ret:
+            break
+        frames_analyzed += 1
+        gray_image = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2GRAY)
+        faces = face_detection(gray_image)
+        if len(faces) == 0:
+            continue
+        _, emotion_predictions = classify_faces(
+            emotion_classifier, face_batch_builder, gray_image, faces,
+            emotion_labels)
+        frame_indices.extend([frame_index] * len(faces))
+        boxes.append(np.asarray(faces))
+        probabilities.append(emotion_predictions)
+    capture.release()
+
+    num_classes = len(emotion_labels)
+    if not boxes:
+        return (np.zeros(0, dtype=np.int32), np.zeros((0, 4), dtype=np.int16),
+                np.zeros((0, num_classes), dtype=np.float16), frames_analyzed)
+    return (np.asarray(frame_indices, dtype=np.int32),
+            np.concatenate(boxes).astype(np.int16),
+            np.concatenate(probabilities).astype(np.float16),
+            frames_analyzed)
+
+
+def _put(item_queue, item, stop_event):
+    """Blocking put that gives up once another stage has failed"""
+    while not stop_event.is_set():
+        try:
+            item_queue.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(item_queue, stop_event):
+    while not stop_event.is_set():
+        try:
+            return item_queue.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return None
+
+
+def analyze_frame_range_pipelined(video_path, start_frame, end_frame,
+                                  frame_stride=1, detection_threads=1,
+                                  queue_size=8, max_batch_faces=32):
+    """Same result as `analyze_frame_range`, but decoding, face detection
+    and classification run as concurrent stages connected by bounded
+    queues.
+
+    A decode thread feeds `detection_threads` detection threads (OpenCV
+    releases the GIL and every thread gets its own cascade), and the
+    calling thread classifies the detected faces of consecutive frames in
+    batches of up to `max_batch_faces`, so a long video runs at the speed
+    of its slowest stage rather than the sum of all three.
+    """
+    face_detection = _worker['face_detection']
+    emotion_classifier = _worker['emotion_classifier']
+    emotion_offsets = _worker['emotion_offsets']
+    frames = queue.Queue(maxsize=queue_size)
+    detections = queue.Queue(maxsize=queue_size)
+    stop_event = threading.Event()
+    errors = []
+    frames_analyzed = [0]
+
+    def decode():
+        capture = cv2.VideoCapture(video_path)
+        try:
+            capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+            for frame_index in range(start_frame, end_frame):
+                if frame_index % frame_stride:
+                    if not capture.grab():
+                        break
+                    continue
+                ret, bgr_image = capture.read()
+                if not ret:
+                    break
+                frames_analyzed[0] += 1
+                gray_image = cv2.cvtColor(bgr_image, cv2.COLOR_BGR2GRAY)
+                if not _put(frames, (frame_index, gray_image), stop_event):
+                    break
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+        finally:
+            capture.release()
+            for _ in range(detection_threads):
+                _put(frames, None, stop_event)
+
+    def detect():
+        try:
+            while True:
+                item = _get(frames, stop_event)
+                if item is None:
+                    break
+                frame_index, gray_image = item
+                faces = face_detection(gray_image)
+                if len(faces) > 0 and not _put(
+                        detections, (frame_index, gray_image, faces),
+                        stop_event):
+                    break
+        except Exception as e:
+            errors.append(e)
+            stop_event.set()
+        finally:
+            _put(detections, None, stop_event)
+
+    threads = [threading.Thread(target=decode, name='video-decode')]
+    threads += [threading.Thread(target=detect, name='video-detect-%d' % i)
+                for i in range(detection_threads)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    height, width = emotion_classifier.target_size
+    batch = np.empty((max_batch_faces, height, width, 1), dtype=np.float32)
+    resized = np.empty((height, width), dtype=np.uint8)
+    frame_indices, boxes, probabilities = [], [], []
+    batch_size = 0
+
+    def classify_batch(batch_size):
+        probabilities.append(emotion_classifier.predict(batch[:batch_size]))
+
+    finished_detectors = 0
+    try:
+        while finished_detectors < detection_threads:
+            item = _get(detections, stop_event)
+            if item is None:
+                if stop_event.is_set():
+                    break
+                finished_detectors += 1
+                continue
+            frame_index, gray_image, faces = item
+            for face_coordinates in faces:
+                x1, x2, y1, y2 = apply_offsets(face_coordinates,
+                                               emotion_offsets)
+                preprocess_input_into(gray_image[max(y1, 0):y2, max(x1, 0):x2],
+                                      batch[batch_size], True, resized)
+                frame_indices.append(frame_index)
+                boxes.append(face_coordinates)
+                batch_size += 1
+                if batch_size == max_batch_faces:
+                    classify_batch(batch_size)
+                    batch_size = 0
+        if batch_size > 0:
+            classify_batch(batch_size)
+    finally:
+        stop_event.set()
+        for thread in threads:
+            thread.join()
+    if errors:
+        raise errors[0]
+
+    num_classes = len(_worker['emotion_labels'])
+    if not frame_indices:
+        return (np.zeros(0, dtype=np.int32), np.zeros((0, 4), dtype=np.int16),
+                np.zeros((0, num_classes), dtype=np.float16),
+                frames_analyzed[0])
+    # several detection threads may finish frames out of order
+    frame_indices = np.asarray(frame_indices, dtype=np.int32)
+    order = np.argsort(frame_indices, kind='stable')
+    return (frame_indices[order],
+            np.asarray(boxes).astype(np.int16)[order],
+            np.concatenate(probabilities).astype(np.float16)[order],
+            frames_analyzed[0])
+
+
+def save_emotion_timeline(output_path, frame_indices, boxes, probabilities,
+                          fps, frame_stride, emotion_labels):
+    """Compact per-frame timeline: one row per detected face, with the
+    frame index, timestamp, box, label index and float16 probabilities."""
+    timestamps = frame_indices / float(fps) if fps else frame_indices * 0.0
+    np.savez_compressed(
+        output_path,
+        frame_indices=frame_indices,
+        timestamps=timestamps.astype(np.float32),
+        boxes=boxes,
+        labels=np.argmax(probabilities, axis=1).astype(np.uint8),
+        probabilities=probabilities,
+        emotion_labels=np.array(list(emotion_labels.values())),
+        fps=fps,
+        frame_stride=frame_stride)
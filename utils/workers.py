@@ -0,0 +1,44 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BoundedExecutor(object):
+    """Native thread pool with a bounded backlog.
+
+    Frame decoding, face detection and inference run in OpenCV / TensorFlow
+    code that releases the GIL, so native threads keep this work off the
+    Socket.IO event loop. `submit` never blocks the caller: once
+    `max_workers + max_pending` tasks are in flight it rejects the task and
+    returns None instead of letting the backlog grow without bound.
+    """
+    def __init__(self, max_workers=4, max_pending=64,
+                 thread_name_prefix='worker'):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            return None
+        with self._lock:
+            self.submitted += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, future):
+        self._slots.release()
+        if future.exception() is not None:
+            print(f"Error in worker task: {future.exception()}")
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)